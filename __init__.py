@@ -1,3 +1,29 @@
-from .binding import Binder
-from .observable import Observable, observable
-from .threads import MainThread
+from .observable import Observable, Disposable, observable, computed, identical, equal, array_equal, by_key
+from .history import History
+from .observable_collections import ObservableList, ObservableDict, Change
+from .progress import Progress
+from .ring_buffer import RingBuffer
+from . import qt
+
+# Imported on first use, so that models and controllers can be used (e.g. in headless worker processes) without
+# importing Qt, or paying for multiprocessing when not replicating.
+_lazy = {
+    'Binder': 'binding',
+    'BindingSpec': 'binding',
+    'MainThread': 'threads',
+    'ProcessReplica': 'replication',
+}
+
+
+def __getattr__(name: str):
+    module = _lazy.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    import importlib
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
@@ -0,0 +1,126 @@
+"""
+asyncio integration. `install()` runs an asyncio event loop on the GUI thread, stepped by the Qt event loop, so that
+coroutines (e.g. `async def` controller methods) can run alongside the UI and update models and widgets directly.
+
+Coroutine functions can be registered with `Observable.add_callback`, and `await model.changed(Model.prop)` waits for a
+property to change. Without a QT application, use asyncio as usual (e.g. `asyncio.run`).
+"""
+import asyncio
+import math
+from typing import Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_driver = None
+
+
+def install(interval_ms: int = 4) -> asyncio.AbstractEventLoop:
+    """
+    Creates an asyncio event loop on the GUI thread, which is stepped by the Qt event loop. The loop is stepped when
+    its selector has I/O ready (watched by a QSocketNotifier), when a timer (e.g. asyncio.sleep) is due, and when
+    callbacks are scheduled, so it costs nothing while idle. If the selector can't be watched (e.g. on Windows), the
+    loop is instead polled every interval_ms. Must be called on the main thread, once a QApplication exists.
+
+    Returns the event loop, which is also set as the current event loop.
+    """
+    global _loop, _driver
+    from .qt import QObject, QTimer, QSocketNotifier
+
+    class _QtSelectorEventLoop(asyncio.SelectorEventLoop):
+        # Wakes the driver (through the loop's self-pipe, which its selector watches) when callbacks are scheduled
+        # outside a step, e.g. by a task created in a Qt slot.
+
+        def call_soon(self, callback, *args, **kwargs):
+            handle = super().call_soon(callback, *args, **kwargs)
+            if not self.is_running():
+                self._write_to_self()
+            return handle
+
+        def call_at(self, when, callback, *args, **kwargs):
+            handle = super().call_at(when, callback, *args, **kwargs)
+            if not self.is_running():
+                self._write_to_self()
+            return handle
+
+    class _LoopDriver(QObject):
+
+        def __init__(self, loop: asyncio.AbstractEventLoop):
+            super().__init__()
+            self._loop = loop
+            self._timer = QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self._step)
+            self._notifier = None
+            try:
+                # noinspection PyProtectedMember,PyUnresolvedReferences
+                selector_fd = loop._selector.fileno()
+            except (AttributeError, NotImplementedError):
+                selector_fd = None
+            if selector_fd is None:
+                self._timer.setSingleShot(False)
+                self._timer.start(interval_ms)
+            else:
+                # An epoll or kqueue descriptor is readable while any of the loop's descriptors are ready.
+                self._notifier = QSocketNotifier(selector_fd, QSocketNotifier.Read, self)
+                self._notifier.activated.connect(self._step)
+                self._timer.start(0)
+
+        def _step(self, *args):
+            if self._loop.is_running():
+                # Qt event loop nested in a callback (e.g. QDialog.exec_); resumes once the callback returns.
+                return
+            # Run the callbacks which are ready, and poll for I/O without blocking.
+            self._loop.call_soon(self._loop.stop)
+            self._loop.run_forever()
+            if self._notifier is not None:
+                self._schedule()
+
+        def _schedule(self):
+            # Step again when the next callback is due. Reads the loop's queues, which asyncio doesn't expose.
+            # noinspection PyProtectedMember,PyUnresolvedReferences
+            ready, scheduled = self._loop._ready, self._loop._scheduled
+            if ready:
+                self._timer.start(0)
+            elif scheduled:
+                delay = scheduled[0].when() - self._loop.time()
+                self._timer.start(max(0, math.ceil(delay * 1000)))
+            else:
+                self._timer.stop()
+
+        def stop(self):
+            self._timer.stop()
+            if self._notifier is not None:
+                self._notifier.setEnabled(False)
+
+    if _loop is not None:
+        return _loop
+    _loop = _QtSelectorEventLoop()
+    asyncio.set_event_loop(_loop)
+    _driver = _LoopDriver(_loop)
+    return _loop
+
+
+def uninstall() -> None:
+    """
+    Stops stepping the event loop installed by `install`, and closes it.
+    """
+    global _loop, _driver
+    if _loop is None:
+        return
+    _driver.stop()
+    _loop.close()
+    asyncio.set_event_loop(None)
+    _loop = _driver = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop on which coroutine callbacks are run: the loop installed by `install`, or else the running loop.
+    """
+    if _loop is not None:
+        return _loop
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        raise RuntimeError('No asyncio event loop available for coroutine callbacks. '
+                           'Call aio.install() after creating the QApplication, or register from within a '
+                           'running event loop.') from None
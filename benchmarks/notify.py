@@ -0,0 +1,46 @@
+"""
+Micro-benchmark of the cost of notifying callbacks when an @observable property is set. Runs without a QT application.
+Run from the directory containing the package: `python -m <package>.benchmarks.notify`
+"""
+import timeit
+
+from .. import Observable, observable
+
+
+class Model(Observable):
+
+    def __init__(self):
+        super().__init__()
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    @value.setter
+    @observable(compare=None)
+    def value(self, val: int) -> None:
+        self._value = val
+
+
+def notify_cost(n_callbacks: int, number: int = 100_000) -> float:
+    """
+    Returns the mean time (in seconds) of a notifying property write with n_callbacks no-op callbacks.
+    """
+    model = Model()
+    for _ in range(n_callbacks):
+        model.add_callback(Model.value, lambda: None)
+
+    def write():
+        model.value = 1
+
+    return min(timeit.repeat(write, number=number, repeat=5)) / number
+
+
+if __name__ == '__main__':
+    baseline = notify_cost(0)
+    print(f'{"callbacks":>10} {"write (ns)":>12} {"per callback (ns)":>18}')
+    for n in (0, 1, 10, 100):
+        t = notify_cost(n)
+        per_callback = (t - baseline) / n if n else 0.0
+        print(f'{n:>10} {t * 1e9:>12.0f} {per_callback * 1e9:>18.1f}')
@@ -0,0 +1,275 @@
+"""
+Benchmark suite for the notify, cross-thread, table/list and binding paths. Runs headless, using Qt's offscreen
+platform, and writes machine-readable JSON which can be compared between runs.
+
+Run from the directory containing the package:
+    python -m <package>.benchmarks.suite --output after.json [--quick] [--compare before.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from .. import Observable, observable, Binder, BindingSpec, MainThread, qt
+from ..qt import QApplication, QWidget, QLineEdit, QLabel
+from ..widget import BindableQTableWidget, BindableQTableView, BindableQListWidget, BindableQListView
+from .notify import notify_cost
+
+
+class Model(Observable):
+
+    def __init__(self):
+        super().__init__()
+        self._text = ''
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    @observable(compare=None)
+    def text(self, val: str) -> None:
+        self._text = val
+
+
+def _process_events_until(app: QApplication, done: Callable[[], bool], timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('Benchmark did not complete in time')
+        app.processEvents()
+
+
+def bench_notify(quick: bool) -> List[Dict]:
+    number = 10_000 if quick else 100_000
+    return [
+        {'benchmark': 'notify', 'params': {'callbacks': n}, 'seconds': notify_cost(n, number)}
+        for n in (0, 1, 10, 100, 1000)
+    ]
+
+
+def bench_execute(app: QApplication, quick: bool) -> List[Dict]:
+    """
+    Throughput and queueing latency of MainThread.execute from N worker threads.
+    """
+    jobs_per_thread = 1_000 if quick else 10_000
+    results = []
+    for n_threads in (1, 4, 16):
+        latencies = []
+
+        def job(submitted):
+            latencies.append(time.perf_counter() - submitted)
+
+        def worker():
+            for _ in range(jobs_per_thread):
+                submitted = time.perf_counter()
+                MainThread.execute(lambda: job(submitted))
+
+        total = n_threads * jobs_per_thread
+        threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        _process_events_until(app, lambda: len(latencies) == total)
+        elapsed = time.perf_counter() - start
+        for t in threads:
+            t.join()
+
+        latencies.sort()
+        results.append({
+            'benchmark': 'execute',
+            'params': {'threads': n_threads, 'jobs': total},
+            'seconds': elapsed,
+            'jobs_per_second': total / elapsed,
+            'latency_median_seconds': statistics.median(latencies),
+            'latency_p99_seconds': latencies[int(0.99 * (total - 1))],
+        })
+    return results
+
+
+def bench_widget_updates(app: QApplication, quick: bool) -> List[Dict]:
+    """
+    Time for the GUI to show the final value after N worker threads write a bound property many times.
+    """
+    writes_per_thread = 1_000 if quick else 10_000
+    results = []
+    for coalesce in (False, True):
+        for n_threads in (1, 4, 16):
+            model = Model()
+            label = QLabel()
+            Binder(model, coalesce=coalesce).one_way(source=Model.text, sink=label.text)
+            final = 'done'
+
+            def worker():
+                for i in range(writes_per_thread):
+                    model.text = str(i)
+
+            threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                # Keep the GUI thread processing while workers write
+                while t.is_alive():
+                    app.processEvents()
+                t.join()
+            model.text = final
+            _process_events_until(app, lambda: label.text() == final)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'benchmark': 'widget_updates',
+                'params': {'threads': n_threads, 'writes': n_threads * writes_per_thread, 'coalesce': coalesce},
+                'seconds': elapsed,
+            })
+    return results
+
+
+def bench_population(quick: bool) -> List[Dict]:
+    """
+    Time to set data on the table and list widgets, for increasing numbers of rows.
+    """
+    n_cols = 4
+    # Item based widgets are too slow to populate with 1M rows
+    sizes = {
+        BindableQTableWidget: (1_000, 10_000) if quick else (1_000, 100_000),
+        BindableQTableView: (1_000, 100_000) if quick else (1_000, 100_000, 1_000_000),
+        BindableQListWidget: (1_000, 10_000) if quick else (1_000, 100_000),
+        BindableQListView: (1_000, 100_000) if quick else (1_000, 100_000, 1_000_000),
+    }
+    results = []
+    for widget_type, row_counts in sizes.items():
+        for n_rows in row_counts:
+            if widget_type is BindableQTableWidget:
+                data = [[str(i * n_cols + j) for j in range(n_cols)] for i in range(n_rows)]
+            elif widget_type is BindableQTableView:
+                data = [[str(i * n_cols + j) for i in range(n_rows)] for j in range(n_cols)]
+            else:
+                data = [str(i) for i in range(n_rows)]
+            best = float('inf')
+            for _ in range(1 if n_rows >= 100_000 else 3):
+                # A new, empty widget each time, as setting the same data again would take the unchanged-data paths
+                widget = widget_type()
+                if widget_type is BindableQTableWidget:
+                    widget.setColumnCount(n_cols)
+                    setter = widget.set_data
+                elif widget_type is BindableQTableView:
+                    setter = widget.set_columns
+                else:
+                    setter = widget.set_text_items
+                start = time.perf_counter()
+                setter(data)
+                best = min(best, time.perf_counter() - start)
+                widget.deleteLater()
+            results.append({
+                'benchmark': 'population',
+                'params': {'widget': widget_type.__name__, 'rows': n_rows},
+                'seconds': best,
+            })
+    return results
+
+
+class _View(QWidget):
+
+    def __init__(self, n_widgets: int):
+        super().__init__()
+        self.line_edits = [QLineEdit(self) for _ in range(n_widgets)]
+
+
+def bench_bind(quick: bool) -> List[Dict]:
+    """
+    Time to bind views with increasing numbers of bindings, through Binder and through a BindingSpec.
+    """
+    results = []
+    for n_bindings in ((10, 100, 1_000) if quick else (10, 100, 1_000, 10_000)):
+        spec = BindingSpec()
+        for i in range(n_bindings):
+            spec.two_way(f'line_edits.{i}.text', Model.text)
+
+        for method in ('binder', 'spec'):
+            view = _View(n_bindings)
+            model = Model()
+            binder = Binder(model)
+            start = time.perf_counter()
+            if method == 'binder':
+                for line_edit in view.line_edits:
+                    binder.two_way(line_edit.text, Model.text)
+            else:
+                binder.apply(spec, view)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'benchmark': 'bind',
+                'params': {'bindings': n_bindings, 'method': method},
+                'seconds': elapsed,
+            })
+            view.deleteLater()
+    return results
+
+
+def run(quick: bool) -> Dict:
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    MainThread.initialise()
+    results = []
+    for bench in (lambda: bench_notify(quick),
+                  lambda: bench_execute(app, quick),
+                  lambda: bench_widget_updates(app, quick),
+                  lambda: bench_population(quick),
+                  lambda: bench_bind(quick)):
+        results += bench()
+        app.processEvents()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'qt': qt.api(),
+            'qt_version': qt.version(),
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def _key(result: Dict) -> str:
+    return result['benchmark'] + json.dumps(result['params'], sort_keys=True)
+
+
+def compare(before: Dict, after: Dict) -> None:
+    """
+    Prints the change in time of each benchmark present in both runs.
+    """
+    before_results = {_key(r): r for r in before['results']}
+    print(f'{"benchmark":<70} {"before (s)":>12} {"after (s)":>12} {"ratio":>8}')
+    for result in after['results']:
+        old = before_results.get(_key(result))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('nan')
+        print(f'{_key(result):<70} {old["seconds"]:>12.6g} {result["seconds"]:>12.6g} {ratio:>8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='File to write JSON results to. Printed to stdout if omitted.')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against.')
+    parser.add_argument('--quick', action='store_true', help='Run smaller workloads.')
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,17 @@
+import time
 from collections import namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
 from functools import partial
+from typing import Optional, List, Dict, Callable
 
-from PySide2.QtWidgets import QWidget, QLineEdit, QLabel, QCheckBox, QProgressBar, QDialog
-
-from .threads import MainThread
-from .observable import Observable
-from .widget import BindableQTableWidget, BindableQListWidget, QMovieWidget
+from .observable import Observable, Disposable
+from .observable_collections import RESET
+from .progress import Progress
+from .qt import Qt, QTimer, QWidget, QLineEdit, QLabel, QCheckBox, QProgressBar, QDialog
+from .threads import MainThread, LazyQWidgetUpdater
+from .widget import BindableQTableWidget, BindableQListWidget, QMovieWidget, BindableQTableView, \
+    BindableQListView, BindableQImageWidget, BindableQPlotWidget
 
 D = namedtuple('Descriptors', 'getter setter update_signal')
 
@@ -24,41 +30,275 @@ qt_getter_setter_signals = [
     D(getter=QDialog.result,                  setter=QDialog.setResult,                  update_signal='finished'),
     D(getter=BindableQListWidget.text_items,  setter=BindableQListWidget.set_text_items, update_signal=None),
     D(getter=QMovieWidget.is_running,         setter=QMovieWidget.set_running,           update_signal=None),
+    D(getter=BindableQTableView.columns,      setter=BindableQTableView.set_columns,     update_signal=None),
+    D(getter=BindableQListView.text_items,    setter=BindableQListView.set_text_items,   update_signal=None),
+    D(getter=BindableQImageWidget.frame,      setter=BindableQImageWidget.set_frame,     update_signal=None),
+    D(getter=BindableQPlotWidget.samples,     setter=BindableQPlotWidget.set_samples,    update_signal=None),
 ]
 
+# This dict relates (unbound) widget setters of collection-valued properties to methods which apply a single Change
+# (e.g. an insertion) to the widget. Such bindings are updated incrementally when the model holds an ObservableList.
+qt_setter_change_appliers = {
+    BindableQTableWidget.set_data:      BindableQTableWidget.apply_change,
+    BindableQListWidget.set_text_items: BindableQListWidget.apply_change,
+    BindableQListView.set_text_items:   BindableQListView.apply_change,
+}
+
+
+class ViewUpdatePolicy(namedtuple('ViewUpdatePolicy', 'debounce_ms throttle_hz commit_signal')):
+    """
+    How view->model updates of a binding are limited. See Binder.one_way.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, debounce_ms: Optional[int], throttle_hz: Optional[float], commit_signal: Optional[str]):
+        if debounce_ms is None and throttle_hz is None and commit_signal is None:
+            return None
+        if debounce_ms is not None and throttle_hz is not None:
+            raise ValueError('A binding can be debounced or throttled, but not both')
+        return cls(debounce_ms, throttle_hz, commit_signal)
+
+    def limit(self, widget: QWidget, update_model: Callable[[], None]):
+        """
+        Returns the slot to connect to the widget's update signal in place of update_model.
+        """
+        if self.debounce_ms is not None:
+            return _Debouncer(widget, update_model, self.debounce_ms)
+        if self.throttle_hz is not None:
+            return _Throttler(widget, update_model, self.throttle_hz)
+        return update_model
+
+
+class _Debouncer:
+    """
+    Calls f once no call has been made for interval_ms. The timer is created by the first call, which comes from the
+    widget's signal and so is made on the GUI thread even if the binding was made on another thread. It is owned by the
+    widget, so is deleted along with it.
+    """
+
+    def __init__(self, widget: QWidget, f: Callable[[], None], interval_ms: int):
+        self._widget = widget
+        self._f = f
+        self._interval_ms = interval_ms
+        self._timer: Optional[QTimer] = None
+        self._stopped = False
+
+    def __call__(self, *args):
+        self._start(self._interval_ms)
+
+    def _start(self, interval_ms: int) -> None:
+        if self._timer is None:
+            self._timer = QTimer(self._widget)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self._timeout)
+        self._timer.start(interval_ms)
+
+    def _timeout(self) -> None:
+        if not self._stopped:
+            self._fire()
+
+    def _fire(self) -> None:
+        self._f()
+
+    def stop(self):
+        # Callable from any thread; a timeout which is already queued is ignored.
+        self._stopped = True
+        MainThread.execute(self._stop_timer)
+
+    def _stop_timer(self) -> None:
+        if self._timer is None:
+            return
+        try:
+            self._timer.stop()
+        except RuntimeError:
+            # Already deleted along with the widget
+            pass
+
+
+class _Throttler(_Debouncer):
+    """
+    Calls f at most rate_hz times per second. Calls made too soon after the last are deferred (not dropped), so the
+    final call is always made.
+    """
+
+    def __init__(self, widget: QWidget, f: Callable[[], None], rate_hz: float):
+        super().__init__(widget, f, 0)
+        self._min_interval = 1 / rate_hz
+        self._last = float('-inf')
+
+    def _fire(self) -> None:
+        self._last = time.perf_counter()
+        self._f()
+
+    def __call__(self, *args):
+        if self._timer is not None and self._timer.isActive():
+            return
+        wait = self._last + self._min_interval - time.perf_counter()
+        if wait <= 0:
+            self._fire()
+        else:
+            self._start(int(wait * 1000))
+
 
 class Binder:
     """
     Class for src properties. Any src which updates the UI (i.e. source='model') _must_ be created on the
     main thread.
+
+    Model->view updates can be coalesced to at most max_update_rate updates per second (latest value wins). Coalescing
+    applies to all bindings if coalesce is true, and can be overridden per binding via the coalesce argument.
+
+    When binding from a secondary thread, each binding waits for its widget updater to be created on the main thread.
+    To avoid this, bindings can be deferred (see `defer`, `flush` and `deferred`) so that all widget updaters are
+    created in one hop to the main thread, without blocking. Model updates made in the meantime are not lost.
+
+    Binding methods return a Disposable which removes the binding. Bindings are also removed automatically when their
+    widget is destroyed.
     """
 
+    default_max_update_rate = 60.0
+
     _descriptors = {
         getter: (setter, signal)
         for getter, setter, signal in qt_getter_setter_signals
     }
 
-    def __init__(self, model: Observable):
+    # (widget class, getter name) -> descriptors, see _get_descriptors
+    _descriptor_cache = {}
+
+    def __init__(self, model: Observable, coalesce: bool = False, max_update_rate: Optional[float] = None):
         self.model = model
+        self.coalesce = coalesce
+        self.max_update_rate = max_update_rate if max_update_rate is not None else self.default_max_update_rate
+        self._deferred_updaters: Optional[List[LazyQWidgetUpdater]] = None
+
+    def defer(self) -> None:
+        """
+        Defers creation of widget updaters for subsequent bindings until `flush` is called.
+        """
+        if self._deferred_updaters is None:
+            self._deferred_updaters = []
+
+    def flush(self) -> 'Future[None]':
+        """
+        Creates the widget updaters of all deferred bindings in a single hop to the main thread, and stops deferring.
+        Does not block.
+
+        Returns a Future which completes once all widget updaters have been created.
+        """
+        updaters = self._deferred_updaters or ()
+        self._deferred_updaters = None
+        return MainThread.materialise(updaters)
+
+    @contextmanager
+    def deferred(self):
+        """
+        Defers creation of widget updaters for bindings made within the block, and flushes them on exit.
+        """
+        self.defer()
+        try:
+            yield self
+        finally:
+            self.flush()
 
-    def two_way(self, element1, element2, initial_value=None):
+    def two_way(self,
+                element1,
+                element2,
+                initial_value=None,
+                coalesce: Optional[bool] = None,
+                debounce_ms: Optional[int] = None,
+                throttle_hz: Optional[float] = None,
+                commit_signal: Optional[str] = None) -> Disposable:
+        """
+        Binds a widget and model property both ways. See one_way for the update policy arguments.
+        """
         widget_getter, model_prop = self._identify(element1, element2)
-        self._bind(widget_getter.__self__,
-                   self.model,
-                   *self._get_descriptors(widget_getter),
-                   model_prop,
-                   'both',
-                   initial_value)
-
-    def one_way(self, source, sink, initial_value=None):
+        return self._bind(widget_getter.__self__,
+                          self.model,
+                          *self._get_descriptors(widget_getter),
+                          model_prop,
+                          'both',
+                          initial_value,
+                          self._update_rate(coalesce),
+                          self._deferred_updaters,
+                          ViewUpdatePolicy.of(debounce_ms, throttle_hz, commit_signal))
+
+    def one_way(self,
+                source,
+                sink,
+                initial_value=None,
+                coalesce: Optional[bool] = None,
+                debounce_ms: Optional[int] = None,
+                throttle_hz: Optional[float] = None,
+                commit_signal: Optional[str] = None) -> Disposable:
+        """
+        Binds a widget to a model property (source=property), or a model property to a widget (source=widget getter).
+
+        View->model updates can be limited by:
+        debounce_ms:    Only update the model once the widget hasn't changed for this many milliseconds.
+        throttle_hz:    Update the model at most this many times per second (including after the last change).
+        commit_signal:  Update the model when this widget signal is emitted (e.g. 'editingFinished') instead of on
+                         every change.
+        """
         widget_getter, model_prop = self._identify(source, sink)
         source = 'model' if source == model_prop else 'view'
-        self._bind(widget_getter.__self__,
-                   self.model,
-                   *self._get_descriptors(widget_getter),
-                   model_property_descriptor=model_prop,
-                   source=source,
-                   initial_value=initial_value)
+        return self._bind(widget_getter.__self__,
+                          self.model,
+                          *self._get_descriptors(widget_getter),
+                          model_property_descriptor=model_prop,
+                          source=source,
+                          initial_value=initial_value,
+                          max_update_rate=self._update_rate(coalesce),
+                          deferred_updaters=self._deferred_updaters,
+                          view_update=ViewUpdatePolicy.of(debounce_ms, throttle_hz, commit_signal))
+
+    def progress_bar(self, progress: Progress, progress_bar: QProgressBar) -> Disposable:
+        """
+        Binds a progress bar's maximum and value to a Progress (rather than to the binder's model). The Progress
+        already limits its update rate, so the bindings aren't coalesced.
+        """
+        binding = Disposable()
+        for getter, prop in ((progress_bar.maximum, Progress.maximum), (progress_bar.value, Progress.value)):
+            binding.add(self._bind(progress_bar,
+                                   progress,
+                                   *self._get_descriptors(getter),
+                                   model_property_descriptor=prop,
+                                   source='model',
+                                   initial_value=prop.fget(progress),
+                                   deferred_updaters=self._deferred_updaters).dispose)
+        return binding
+
+    def _update_rate(self, coalesce: Optional[bool]) -> Optional[float]:
+        """
+        Max update rate of a binding, or None if the binding isn't coalesced. Falls back to the binder's setting if
+        coalesce is None.
+        """
+        if coalesce is None:
+            coalesce = self.coalesce
+        return self.max_update_rate if coalesce else None
+
+    def apply(self, spec: 'BindingSpec', view) -> Disposable:
+        """
+        Applies the bindings declared by spec to an instance of a view class.
+        """
+        binding = Disposable()
+        # noinspection PyProtectedMember
+        for b in spec._compiled_for(view):
+            widget = b.resolve(view)
+            descriptors = b.descriptors
+            if type(widget) is not b.widget_type:
+                descriptors = self._get_descriptors_for_type(type(widget), b.getter_name)
+            binding.add(self._bind(widget,
+                                   self.model,
+                                   *descriptors,
+                                   b.prop,
+                                   b.source,
+                                   b.initial_value,
+                                   self._update_rate(b.coalesce),
+                                   self._deferred_updaters,
+                                   b.view_update).dispose)
+        return binding
 
     @staticmethod
     def _inflate(getter_descriptor, setter_descriptor, signal_name, widget: QWidget):
@@ -72,10 +312,10 @@ class Binder:
 
     @staticmethod
     def _inflate_model_functions(prop: property, model):
-        # These partial classes can be eliminated for better performance
+        # Bound methods are cheaper to create and call than partials
         return (
-            partial(prop.fget, model),
-            partial(prop.fset, model),
+            prop.fget.__get__(model),
+            prop.fset.__get__(model),
         )
 
     @classmethod
@@ -87,7 +327,10 @@ class Binder:
               widget_signal_descriptor,
               model_property_descriptor,
               source: str,
-              initial_value):
+              initial_value,
+              max_update_rate: Optional[float] = None,
+              deferred_updaters: Optional[List[LazyQWidgetUpdater]] = None,
+              view_update: Optional['ViewUpdatePolicy'] = None) -> Disposable:
         w_getter, w_setter, w_sig = cls._inflate(widget_getter_descriptor,
                                                  widget_setter_descriptor,
                                                  widget_signal_descriptor,
@@ -100,6 +343,10 @@ class Binder:
             w_setter(initial_value)
             m_setter(initial_value)
 
+        commit_signal = view_update.commit_signal if view_update is not None else None
+        if commit_signal is not None:
+            w_sig = getattr(widget, commit_signal)
+
         if w_sig is None and source in ('view', 'both'):
             raise RuntimeError(
                 f'Binding '
@@ -108,13 +355,37 @@ class Binder:
                 f'"{type(model).__name__}.{model_property_descriptor.fget.__name__}" '
                 f'is missing a signal in qt_getter_setter_signals.')
 
-        if source in ('model', 'both'):
+        binding = Disposable()
+        # Cleared when the widget is destroyed, after which Qt has removed its connections itself
+        widget_alive = [True]
+        apply_change_descriptor = qt_setter_change_appliers.get(widget_setter_descriptor)
+        if source in ('model', 'both') and apply_change_descriptor is not None:
+            # Changes must all be applied, in order, so these bindings are neither coalesced nor deferred.
+            applier = MainThread.create_QWidgetChangeApplier(widget,
+                                                             w_setter,
+                                                             apply_change_descriptor.__get__(widget),
+                                                             m_getter)
+            # noinspection PyProtectedMember
+            callback = model._add_binding_change_callback(model_property_descriptor, applier)
+            binding.add(callback.dispose)
+            if initial_value is None and m_getter() is not None:
+                # Show the current collection, so that subsequent changes apply to the same rows in the widget as in
+                # the model. Queued after registering, so that it also corrects any change made in the meantime.
+                applier(RESET)
+        elif source in ('model', 'both'):
+            # Thread-safe models provide versioned values, so updaters can skip values which arrive out of order.
+            versioned = model.thread_safe
+            getter = partial(model.versioned, model_property_descriptor) if versioned else m_getter
+            if deferred_updaters is not None:
+                # Created later, by MainThread.materialise
+                updater = LazyQWidgetUpdater(widget, w_setter, getter, max_update_rate, versioned)
+                deferred_updaters.append(updater)
+            else:
+                updater = MainThread.create_QWidgetUpdater(widget, w_setter, getter, max_update_rate,
+                                                           versioned=versioned)
             # Note that callback will get model value -just- before update, not necessarily of model value at change.
             # noinspection PyProtectedMember
-            model._add_binding_callback(
-                model_property_descriptor,
-                MainThread.create_QWidgetUpdater(widget, w_setter, m_getter)
-            )
+            binding.add(model._add_binding_callback(model_property_descriptor, updater).dispose)
 
         if source in ('view', 'both'):
             # noinspection PyProtectedMember
@@ -123,7 +394,35 @@ class Binder:
                 m_setter(w_getter())
                 model._enable_view_bindings(model_property_descriptor)
 
-            w_sig.connect(update_model)
+            slot = update_model
+            if view_update is not None:
+                slot = view_update.limit(widget, update_model)
+                if slot is not update_model:
+                    binding.add(slot.stop)
+            # Direct, so the slot runs on the widget's (GUI) thread even if connected from another thread. (PySide2 would
+            # otherwise queue calls to the connecting thread.)
+            w_sig.connect(slot, Qt.DirectConnection)
+            binding.add(partial(cls._disconnect, w_sig, slot, widget_alive))
+
+        # Drop the binding (and with it, the model's references to the widget) once the widget is gone. Qt only holds
+        # bound methods weakly, and callers usually discard the binding, so connect a function which holds it.
+        def on_destroyed(*_):
+            widget_alive[0] = False
+            binding.dispose()
+
+        widget.destroyed.connect(on_destroyed, Qt.DirectConnection)
+        binding.add(partial(cls._disconnect, widget.destroyed, on_destroyed, widget_alive))
+        return binding
+
+    @staticmethod
+    def _disconnect(signal, slot, widget_alive: List[bool]) -> None:
+        if not widget_alive[0]:
+            return
+        try:
+            signal.disconnect(slot)
+        except RuntimeError:
+            # Widget already deleted, so the connection is gone too.
+            pass
 
     @staticmethod
     def _identify(arg1, arg2):
@@ -149,10 +448,19 @@ class Binder:
         :param widget_getter: The (bound) widget's getter method
         :return: Descriptors of the getter, setter, and signal
         """
+        return cls._get_descriptors_for_type(type(widget_getter.__self__), widget_getter.__name__)
+
+    @classmethod
+    def _get_descriptors_for_type(cls, widget_type: type, getter_name: str):
+        """
+        As _get_descriptors, but for a widget class and getter name. Results are cached.
+        """
+        try:
+            return cls._descriptor_cache[widget_type, getter_name]
+        except KeyError:
+            pass
         # Look up widget class details
-        getter_name = widget_getter.__name__
-        widget_obj = widget_getter.__self__
-        widget_classes = type(widget_obj).mro()
+        widget_classes = widget_type.mro()
 
         # Look up matching setter and signal descriptors.
         # If they are missing for the widget class in the dictionary,
@@ -163,6 +471,7 @@ class Binder:
                 if not callable(getter_descriptor):
                     continue
                 out = getter_descriptor, *cls._descriptors[getter_descriptor]
+                cls._descriptor_cache[widget_type, getter_name] = out
                 return out
             except (AttributeError, KeyError):
                 # AttributeError: missing descriptor
@@ -173,3 +482,98 @@ class Binder:
         raise RuntimeError(f'Matching setter not found for {getter_name} '
                            f'under the parent classes:  {[c.__name__ for c in widget_classes]}. '
                            f'Please add to the src module.')
+
+
+class _CompiledBinding(namedtuple('CompiledBinding',
+                                  'path getter_name widget_type descriptors prop source initial_value coalesce '
+                                  'view_update')):
+    __slots__ = ()
+
+    def resolve(self, view):
+        """
+        Returns the widget at this binding's attribute path on view.
+        """
+        widget = view
+        for attribute in self.path:
+            widget = widget[attribute] if type(attribute) is int else getattr(widget, attribute)
+        return widget
+
+
+class BindingSpec:
+    """
+    Bindings declared once, at class level, for a view class. Widgets are referred to by attribute paths on the view,
+    ending with the getter name, e.g. 'line_edit.text' or 'radio_buttons.0.isChecked'. Widget descriptors are looked
+    up and validated when the spec is first applied to an instance of a view class, and reused for later instances.
+
+    class RowEditor(QWidget):
+        bindings = (BindingSpec()
+                    .two_way('line_edit.text', Model.edit_text)
+                    .one_way(source=Model.label_text, sink='label.text'))
+
+        def bind_to_model(self, model):
+            Binder(model).apply(self.bindings, self)
+    """
+
+    def __init__(self):
+        self._declared = []
+        self._compiled: Dict[type, List[_CompiledBinding]] = {}
+
+    def two_way(self,
+                widget_getter: str,
+                prop: property,
+                initial_value=None,
+                coalesce: Optional[bool] = None,
+                debounce_ms: Optional[int] = None,
+                throttle_hz: Optional[float] = None,
+                commit_signal: Optional[str] = None) -> 'BindingSpec':
+        if type(prop) is not property:
+            raise RuntimeError(f'Expected a model property, but received {type(prop)}')
+        view_update = ViewUpdatePolicy.of(debounce_ms, throttle_hz, commit_signal)
+        self._declared.append((widget_getter, prop, 'both', initial_value, coalesce, view_update))
+        return self
+
+    def one_way(self,
+                source,
+                sink,
+                initial_value=None,
+                coalesce: Optional[bool] = None,
+                debounce_ms: Optional[int] = None,
+                throttle_hz: Optional[float] = None,
+                commit_signal: Optional[str] = None) -> 'BindingSpec':
+        view_update = ViewUpdatePolicy.of(debounce_ms, throttle_hz, commit_signal)
+        if type(source) is property and type(sink) is str:
+            self._declared.append((sink, source, 'model', initial_value, coalesce, view_update))
+        elif type(source) is str and type(sink) is property:
+            self._declared.append((source, sink, 'view', initial_value, coalesce, view_update))
+        else:
+            raise RuntimeError('Expected a widget getter path and a model property, '
+                               f'but received {type(source)} and {type(sink)}')
+        return self
+
+    def _compiled_for(self, view) -> List[_CompiledBinding]:
+        try:
+            return self._compiled[type(view)]
+        except KeyError:
+            pass
+        compiled = [self._compile(view, *declared) for declared in self._declared]
+        self._compiled[type(view)] = compiled
+        return compiled
+
+    @staticmethod
+    def _compile(view,
+                 widget_getter: str,
+                 prop: property,
+                 source: str,
+                 initial_value,
+                 coalesce,
+                 view_update) -> _CompiledBinding:
+        *path, getter_name = widget_getter.split('.')
+        path = tuple(int(p) if p.isdigit() else p for p in path)
+        compiled = _CompiledBinding(path, getter_name, None, None, prop, source, initial_value, coalesce, view_update)
+        widget_type = type(compiled.resolve(view))
+        descriptors = Binder._get_descriptors_for_type(widget_type, getter_name)
+        has_signal = descriptors[2] is not None or (view_update is not None and view_update.commit_signal is not None)
+        if not has_signal and source in ('view', 'both'):
+            raise RuntimeError(f'Binding "{type(view).__name__}.{widget_getter}" -> "{prop.fget.__name__}" '
+                               f'is missing a signal in qt_getter_setter_signals.')
+        return compiled._replace(widget_type=widget_type, descriptors=descriptors)
@@ -77,10 +77,7 @@ class MainModel(Observable):
         self._checked_3 = val
 
     def __repr__(self):
-        klass = self.__class__
-        prop_names = [a for a in dir(klass)
-                      if type(getattr(klass, a)) == property]
-        return str({n: getattr(self, n) for n in prop_names})
+        return str(self.snapshot())
 
 
 class MainController:
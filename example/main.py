@@ -1,10 +1,9 @@
 import sys
 
-from PySide2.QtWidgets import QApplication
-
-from controller import MainModel
-from controller import MainController
-from view import MainView
+from .controller import MainModel
+from .controller import MainController
+from .view import MainView
+from ..qt import QApplication
 
 if __name__ == '__main__':
     # Create the Qt Application
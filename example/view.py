@@ -1,7 +1,6 @@
-from PySide2.QtWidgets import QLineEdit, QDialog, QPushButton, QVBoxLayout, QLabel, QCheckBox, QRadioButton
-
 from .controller import MainModel, MainController
 from .. import Binder
+from ..qt import QLineEdit, QDialog, QPushButton, QVBoxLayout, QLabel, QCheckBox, QRadioButton
 
 
 class MainView(QDialog):
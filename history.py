@@ -0,0 +1,226 @@
+import sys
+from collections import deque
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+from .observable import Observable, Disposable, _UNCHANGED_IF_IDENTICAL
+from .observable_collections import Change, ObservableCollection
+
+
+def _size(value) -> int:
+    """
+    Approximate memory held by value: the buffer size of arrays, otherwise the shallow size.
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    return nbytes if type(nbytes) is int else sys.getsizeof(value)
+
+
+class _Delta:
+    """
+    A single property change. Either an assignment (old and new values of the property) or an in-place change of the
+    collection held by the property. Values are referenced, not copied.
+    """
+    __slots__ = ('name', 'old', 'new', 'change', 'size')
+
+    def __init__(self, name: str, old=None, new=None, change: Optional[Change] = None):
+        self.name = name
+        self.old = old
+        self.new = new
+        self.change = change
+        if change is None:
+            self.size = _size(old) + _size(new)
+        else:
+            self.size = sum(_size(item) for item in change.items + change.old_items)
+
+    def apply(self, model: Observable, undo: bool) -> None:
+        if self.change is None:
+            setattr(model, self.name, self.old if undo else self.new)
+            return
+        collection = getattr(model, self.name)
+        change = self.change
+        kind = change.kind
+        if undo:
+            kind = {'insert': 'remove', 'remove': 'insert'}.get(kind, kind)
+        if isinstance(collection, Mapping):
+            if kind == 'remove':
+                del collection[change.key]
+            elif kind == 'insert':
+                collection[change.key] = change.items[0]
+            else:
+                collection[change.key] = change.old_items[0] if undo else change.items[0]
+            return
+        n = len(change.items)
+        if kind == 'remove':
+            del collection[change.index:change.index + n]
+        elif kind == 'insert':
+            collection[change.index:change.index] = change.items
+        elif kind == 'replace':
+            collection[change.index:change.index + n] = change.old_items if undo else change.items
+        elif undo:
+            collection.move(change.destination, change.index)
+        else:
+            collection.move(change.index, change.destination)
+
+
+class History:
+    """
+    Undo/redo history of a model's observable properties.
+
+    Only the changed property is recorded for each write: its old and new values for assignments (by reference, so
+    large values are not copied), or the change itself for in-place modifications of ObservableLists and
+    ObservableDicts. Once the values referenced by the history exceed max_bytes (approximately), or there are more than
+    max_steps undo steps, the oldest steps are dropped.
+
+    In-place changes which can't be reverted (sorting or reversing a list, clearing a dict, changing a collection
+    within deferred_notifications, or modifying a plain list or array in place and assigning it again) clear the
+    history.
+
+    Parameters
+    ----------
+    model : Observable
+        Model to record.
+    max_bytes : int
+        Approximate memory budget of the values held by the undo and redo steps.
+    max_steps : int, optional
+        Maximum number of undo steps.
+    """
+
+    def __init__(self, model: Observable, max_bytes: int = 64 * 1024 ** 2, max_steps: Optional[int] = None):
+        self.model = model
+        self.max_bytes = max_bytes
+        self.max_steps = max_steps
+        self._undo: Deque[List[_Delta]] = deque()
+        self._redo: List[List[_Delta]] = []
+        self._bytes = 0
+        self._group: Optional[List[_Delta]] = None
+        self._group_depth = 0
+        self._applying = False
+        # Current value of each property, to find the old value on assignment
+        self._values: Dict[str, Any] = model.snapshot()
+        self._subscription = Disposable(*(
+            model.add_change_callback(getattr(type(model), name),
+                                      lambda change, name=name: self._record(name, change)).dispose
+            for name in self._values
+        ))
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def size(self) -> int:
+        """
+        Approximate memory, in bytes, held by the undo and redo steps.
+        """
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    @contextmanager
+    def group(self):
+        """
+        Records all changes made within the block as a single undo step. Blocks may be nested.
+        """
+        if self._group_depth == 0:
+            self._group = []
+        self._group_depth += 1
+        try:
+            yield self
+        finally:
+            self._group_depth -= 1
+            if self._group_depth == 0:
+                group, self._group = self._group, None
+                if group:
+                    self._push(group)
+
+    def undo(self) -> bool:
+        """
+        Reverts the last step, notifying observers once. Returns False if there was nothing to undo.
+        """
+        if not self._undo:
+            return False
+        step = self._undo.pop()
+        self._apply(step, undo=True)
+        self._redo.append(step)
+        return True
+
+    def redo(self) -> bool:
+        """
+        Reapplies the last undone step, notifying observers once. Returns False if there was nothing to redo.
+        """
+        if not self._redo:
+            return False
+        step = self._redo.pop()
+        self._apply(step, undo=False)
+        self._undo.append(step)
+        return True
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+
+    def dispose(self) -> None:
+        """
+        Stops recording, and releases the recorded values.
+        """
+        self._subscription.dispose()
+        self.clear()
+        self._values.clear()
+
+    def _apply(self, step: List[_Delta], undo: bool) -> None:
+        model = self.model
+        self._applying = True
+        try:
+            with model.deferred_notifications():
+                for delta in (reversed(step) if undo else step):
+                    delta.apply(model, undo)
+        finally:
+            self._applying = False
+        for delta in step:
+            self._values[delta.name] = getattr(model, delta.name)
+
+    def _record(self, name: str, change: Change) -> None:
+        if self._applying:
+            return
+        old = self._values[name]
+        new = getattr(self.model, name)
+        self._values[name] = new
+        if isinstance(new, ObservableCollection) and change.kind != 'reset':
+            # May not be the object recorded, if an equal collection was assigned (without notifying) since
+            delta = _Delta(name, change=change)
+        elif new is not old:
+            delta = _Delta(name, old, new)
+        elif isinstance(new, ObservableCollection) or not isinstance(new, _UNCHANGED_IF_IDENTICAL):
+            # Mutable value (e.g. a list or an array) modified in place and reassigned, so earlier steps, which may
+            # refer to it, can't be reverted
+            self.clear()
+            if self._group is not None:
+                self._group.clear()
+            return
+        else:
+            # Same immutable value reassigned without a comparator
+            return
+        if self._group is not None:
+            self._group.append(delta)
+        else:
+            self._push([delta])
+
+    def _push(self, step: List[_Delta]) -> None:
+        for redone in self._redo:
+            self._bytes -= sum(delta.size for delta in redone)
+        self._redo.clear()
+        self._undo.append(step)
+        self._bytes += sum(delta.size for delta in step)
+        while len(self._undo) > 1 and (self._bytes > self.max_bytes or
+                                       (self.max_steps is not None and len(self._undo) > self.max_steps)):
+            self._bytes -= sum(delta.size for delta in self._undo.popleft())
+        if self.max_steps is not None and len(self._undo) > self.max_steps:
+            self._undo.clear()
+            self._bytes = 0
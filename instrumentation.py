@@ -0,0 +1,195 @@
+"""
+Opt-in instrumentation of notifications, callbacks, cross-thread jobs and widget updates.
+
+While disabled, the notify and cross-thread paths are not modified at all, and widget updates only check a flag. Call
+`enable()` to start recording, `snapshot()` to retrieve the statistics, and `start_periodic_dump()` to report them
+regularly.
+"""
+import json
+import math
+import sys
+import threading
+import time
+from typing import Dict, Tuple, Callable, Any, Optional
+
+enabled = False
+
+_lock = threading.Lock()
+_originals: Dict[str, Any] = {}
+_dump_stop: Optional[threading.Event] = None
+
+
+class Stat:
+    """
+    Count, total, maximum and a histogram of durations. Histogram buckets are powers of two, in microseconds.
+    """
+    __slots__ = ('count', 'total', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram: Dict[int, int] = {}
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = 1 << max(0, math.ceil(math.log2(max(seconds * 1e6, 1))))
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def as_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'max_seconds': self.max,
+            'histogram_us': {f'<={bucket}': n for bucket, n in sorted(self.histogram.items())},
+        }
+
+
+# (model class, property) -> time spent in all callbacks of a notification
+notifications: Dict[Tuple[str, str], Stat] = {}
+# (model class, property, callback) -> time spent in the callback
+callbacks: Dict[Tuple[str, str, str], Stat] = {}
+# function -> time between being queued for, and starting to run on, the main thread
+queue_waits: Dict[str, Stat] = {}
+# (widget class, setter) -> time spent in widget setters called by bindings
+widget_setters: Dict[Tuple[str, str], Stat] = {}
+
+
+def _name(f) -> str:
+    return getattr(f, '__qualname__', None) or type(f).__name__
+
+
+def _record(stats: Dict, key, seconds: float) -> None:
+    with _lock:
+        stat = stats.get(key)
+        if stat is None:
+            stat = stats[key] = Stat()
+        stat.add(seconds)
+
+
+def record_widget_setter(widget, widget_setter, seconds: float) -> None:
+    _record(widget_setters, (type(widget).__name__, _name(widget_setter)), seconds)
+
+
+def _run_callbacks(self, property_name: str, include_view_bindings: bool, change) -> None:
+    # Instrumented version of Observable._run_callbacks. Compiled callbacks are in the same order as the registries.
+    # Notifications of properties without callbacks are counted too
+    table = self._dispatch_table(property_name)
+    model_name = type(self).__name__
+    notify_start = time.perf_counter()
+    if table.all or table.change_all:
+        for registry, compiled, args in (
+                (self._callbacks, table.all if include_view_bindings else table.non_view, ()),
+                (self._change_callbacks, table.change_all if include_view_bindings else table.change_non_view,
+                 (change,)),
+        ):
+            registered = [c for c in tuple(registry.get(property_name, ()))
+                          if include_view_bindings or not c.is_view_binding]
+            for f, callback in zip(compiled, registered):
+                start = time.perf_counter()
+                f(*args)
+                _record(callbacks, (model_name, property_name, _name(callback.f)), time.perf_counter() - start)
+    _record(notifications, (model_name, property_name), time.perf_counter() - notify_start)
+
+
+def _enqueue(cls, fn, report_exceptions=True):
+    # Instrumented version of MainThread._enqueue
+    submitted = time.perf_counter()
+
+    def timed():
+        _record(queue_waits, _name(fn), time.perf_counter() - submitted)
+        return fn()
+
+    return _originals['_enqueue'].__func__(cls, timed, report_exceptions)
+
+
+def enable() -> None:
+    """
+    Starts recording. Installs instrumented versions of Observable._run_callbacks and MainThread._enqueue (once the
+    threads module is imported, if it isn't yet).
+    """
+    global enabled
+    from .observable import Observable
+    if enabled:
+        return
+    _originals['_run_callbacks'] = Observable.__dict__['_run_callbacks']
+    Observable._run_callbacks = _run_callbacks
+    # Only if MainThread is already in use, so that headless processes don't import Qt. Otherwise, the threads module
+    # instruments it when first imported.
+    threads = sys.modules.get(f'{__package__}.threads')
+    if threads is not None:
+        _instrument_main_thread(threads.MainThread)
+    enabled = True
+
+
+def _instrument_main_thread(main_thread) -> None:
+    """
+    Installs the instrumented version of MainThread._enqueue.
+    """
+    if '_enqueue' not in _originals:
+        _originals['_enqueue'] = main_thread.__dict__['_enqueue']
+        main_thread._enqueue = classmethod(_enqueue)
+
+
+def disable() -> None:
+    """
+    Stops recording, and restores the uninstrumented code paths. Recorded statistics are kept.
+    """
+    global enabled
+    from .observable import Observable
+    if not enabled:
+        return
+    Observable._run_callbacks = _originals.pop('_run_callbacks')
+    if '_enqueue' in _originals:
+        from .threads import MainThread
+        MainThread._enqueue = _originals.pop('_enqueue')
+    enabled = False
+
+
+def reset() -> None:
+    with _lock:
+        for stats in (notifications, callbacks, queue_waits, widget_setters):
+            stats.clear()
+
+
+def snapshot() -> Dict:
+    """
+    Returns a JSON-serialisable copy of the statistics recorded so far.
+    """
+    with _lock:
+        return {
+            'notifications': {'.'.join(k): s.as_dict() for k, s in notifications.items()},
+            'callbacks': {'.'.join(k[:2]) + f' -> {k[2]}': s.as_dict() for k, s in callbacks.items()},
+            'queue_waits': {k: s.as_dict() for k, s in queue_waits.items()},
+            'widget_setters': {'.'.join(k): s.as_dict() for k, s in widget_setters.items()},
+        }
+
+
+def _print_snapshot(snap: Dict) -> None:
+    print(json.dumps(snap, indent=2))
+
+
+def start_periodic_dump(interval: float, sink: Callable[[Dict], None] = _print_snapshot) -> None:
+    """
+    Passes a snapshot to sink (by default, printed as JSON) every interval seconds, on a background thread.
+    """
+    global _dump_stop
+    stop_periodic_dump()
+    stop = _dump_stop = threading.Event()
+
+    def dump():
+        while not stop.wait(interval):
+            sink(snapshot())
+
+    threading.Thread(target=dump, name='instrumentation-dump', daemon=True).start()
+
+
+def stop_periodic_dump() -> None:
+    global _dump_stop
+    if _dump_stop is not None:
+        _dump_stop.set()
+        _dump_stop = None
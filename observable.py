@@ -1,32 +1,300 @@
 import functools
+import inspect
+import itertools
+import threading
+import weakref
 from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Callable, Dict, List
+from functools import partial
+from typing import Callable, Dict, List, Any, Optional, Tuple, Set, Iterable, TYPE_CHECKING
 
-from .threads import MainThread
+from .observable_collections import Change, ObservableCollection, RESET
 
+if TYPE_CHECKING:
+    # Only imported when needed, as they're slow to import and worker processes often don't use them
+    import asyncio
+    from concurrent.futures import Executor, Future
 
-@dataclass
+Comparator = Callable[[Any, Any], bool]
+
+
+def identical(old, new) -> bool:
+    return old is new
+
+
+# Values which can't have changed if the same object is assigned again. Observable collections notify of their own
+# modifications, so reassigning one needn't notify again.
+_UNCHANGED_IF_IDENTICAL = (str, bytes, int, float, complex, bool, tuple, frozenset, type(None), ObservableCollection)
+
+
+def equal(old, new) -> bool:
+    if old is new:
+        # A mutable value may have been modified in place before being reassigned, e.g.
+        # `items = model.items; items.append(x); model.items = items`, so it must be notified.
+        return isinstance(old, _UNCHANGED_IF_IDENTICAL)
+    try:
+        return bool(old == new)
+    except (ValueError, TypeError):
+        # e.g. NumPy arrays, which don't have a single truth value
+        return False
+
+
+def array_equal(old, new) -> bool:
+    import numpy as np
+    # An array reassigned to itself may have been modified in place, so is never considered equal
+    return old is not new and np.array_equal(old, new)
+
+
+def by_key(key: Callable[[Any], Any]) -> Comparator:
+    """
+    Compares values by a cheap key, e.g. a version number or hash: `by_key(lambda frame: frame.version)`.
+    """
+    return lambda old, new: key(old) == key(new)
+
+
+class Disposable:
+    """
+    Handle to a registration (e.g. a callback or binding). Call dispose() to undo the registration. Disposing more
+    than once has no effect.
+    """
+    __slots__ = ('_disposers',)
+
+    def __init__(self, *disposers: Callable[[], None]):
+        self._disposers: List[Callable[[], None]] = list(disposers)
+
+    @property
+    def disposed(self) -> bool:
+        return not self._disposers
+
+    def add(self, disposer: Callable[[], None]) -> None:
+        self._disposers.append(disposer)
+
+    def dispose(self, *args) -> None:
+        # Accepts (and ignores) arguments so it can be connected to signals directly
+        disposers, self._disposers = self._disposers, []
+        for disposer in disposers:
+            disposer()
+
+
+def _weak_callable(f: Callable[..., None], on_collected: Callable[[], None]) -> Callable[..., None]:
+    """
+    Wraps f so that it is only weakly referenced. on_collected is called when f (or, for a bound method, its object)
+    is garbage collected.
+    """
+    if inspect.ismethod(f):
+        ref = weakref.WeakMethod(f, lambda _: on_collected())
+    else:
+        ref = weakref.ref(f, lambda _: on_collected())
+
+    def call(*args):
+        target = ref()
+        if target is not None:
+            return target(*args)
+
+    return call
+
+
+def _main_thread_callable(f: Callable[..., Any]) -> Callable[..., None]:
+    """
+    Wraps f so that calling it (with any arguments) runs it on the GUI thread. Until a Qt binding is imported, e.g. in
+    headless processes, f is called directly, as MainThread.execute would without a QApplication, and Qt isn't imported.
+    """
+    from . import qt
+
+    def call(*args):
+        if qt.is_imported():
+            # Imported here, as it needs Qt, which models and controllers otherwise don't
+            from .threads import MainThread
+            MainThread.execute(partial(f, *args) if args else f)
+        else:
+            f(*args)
+
+    return call
+
+
+def _coroutine_callable(f: Callable[..., Any]) -> Callable[..., None]:
+    """
+    Wraps a coroutine function so that calling it (from any thread) schedules the coroutine as a task on the event loop
+    given by aio.get_loop() at the time of wrapping.
+    """
+    from .aio import get_loop
+    loop = get_loop()
+
+    def call(*args):
+        coroutine = f(*args)
+        if coroutine is not None:
+            loop.call_soon_threadsafe(loop.create_task, coroutine)
+
+    return call
+
+
+class _ExecutorCallback:
+    """
+    Callback which submits f(value of the property) to an executor, and passes the result to on_result. If latest_only,
+    runs superseded by a newer notification are cancelled if not yet started, and their results dropped otherwise.
+    """
+    __slots__ = ('_f', '_getter', '_executor', '_latest_only', '_on_result', '_counter', '_latest', '_future')
+
+    def __init__(self,
+                 f: Callable[[Any], Any],
+                 getter: Callable[[], Any],
+                 executor: 'Executor',
+                 latest_only: bool,
+                 on_result: Optional[Callable[[Any], None]]):
+        self._f = f
+        self._getter = getter
+        self._executor = executor
+        self._latest_only = latest_only
+        self._on_result = on_result
+        self._counter = itertools.count()
+        self._latest = -1
+        self._future: Optional['Future'] = None
+
+    def __call__(self):
+        value = self._getter()
+        generation = self._latest = next(self._counter)
+        previous = self._future
+        if self._latest_only and previous is not None:
+            previous.cancel()
+        future = self._future = self._executor.submit(self._f, value)
+        future.add_done_callback(partial(self._done, generation))
+
+    def _done(self, generation: int, future: 'Future') -> None:
+        if future.cancelled() or (self._latest_only and generation != self._latest):
+            return
+        # Raises (and so logs) any exception of f
+        result = future.result()
+        if self._on_result is not None:
+            self._on_result(result)
+
+
+def _set_result(future: 'asyncio.Future', value) -> None:
+    if not future.done():
+        future.set_result(value)
+
+
+@dataclass(eq=False)
 class Callback:
-    f: Callable[[], None]
+    # Compared and hashed by identity, so that registries can be ordered sets (dicts with None values)
+    __slots__ = ('f', 'run_in_main_thread', 'is_view_binding')
+    f: Callable[..., None]
     run_in_main_thread: bool
     is_view_binding: bool
 
+    def compile(self) -> Callable[..., None]:
+        """
+        Returns a function which runs the callback (with any arguments) on the right thread.
+        """
+        f = self.f
+        if not self.run_in_main_thread:
+            return f
+        return _main_thread_callable(f)
+
+
+class DispatchTable:
+    """
+    Callbacks of a single property, compiled so that notifying is a loop over a tuple. Callbacks are kept in
+    registration order. Tables are compiled on the first notification after the property's callbacks change, so that
+    registering or removing many callbacks doesn't recompile the table each time.
+    """
+    __slots__ = ('all', 'non_view', 'change_all', 'change_non_view')
+
+    def __init__(self, callbacks: Iterable[Callback], change_callbacks: Iterable[Callback]):
+        self.all: Tuple[Callable[[], None], ...] = tuple(c.compile() for c in callbacks)
+        self.non_view: Tuple[Callable[[], None], ...] = tuple(c.compile() for c in callbacks if not c.is_view_binding)
+        self.change_all: Tuple[Callable[[Change], None], ...] = tuple(c.compile() for c in change_callbacks)
+        self.change_non_view: Tuple[Callable[[Change], None], ...] = tuple(c.compile() for c in change_callbacks
+                                                                          if not c.is_view_binding)
+
+
+class _ComputedValue:
+    __slots__ = ('value', 'valid', 'has_value', 'dependencies', 'compare')
+
+    def __init__(self, compare):
+        self.value = None
+        self.valid = False
+        self.has_value = False
+        self.dependencies: frozenset = frozenset()
+        self.compare = compare
+
+
+class _BatchState(threading.local):
+    """
+    Batching state of a model. Kept per thread, so that one thread's batch neither defers nor takes over the
+    notifications of other threads' writes.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        # Property name -> whether view bindings should be notified on flush
+        self.pending: Dict[str, bool] = {}
+
+
+class _DependencyRecorder:
+    """
+    Stands in for a model while a computed property's getter runs, recording which properties the getter reads.
+    """
+    __slots__ = ('_recorded_model', '_recorded_dependencies')
+
+    def __init__(self, model, dependencies: Set[str]):
+        self._recorded_model = model
+        self._recorded_dependencies = dependencies
+
+    def __getattr__(self, name):
+        model = self._recorded_model
+        if type(getattr(type(model), name, None)) is property:
+            self._recorded_dependencies.add(name)
+        return getattr(model, name)
+
 
 class Observable:
+    """
+    Mix-in for models whose properties have @observable setters.
+
+    Set `thread_safe = True` on a model class whose properties are written from several threads. Each write then holds
+    a per-property lock and increments the property's version, `snapshot()` returns a consistent set of values without
+    blocking writers, and widget bindings skip updates older than the value already shown.
+    """
+    thread_safe = False
+
+    # Observable property names of each model class, in definition order
+    _observable_property_cache: Dict[type, Tuple[str, ...]] = {}
 
     def __init__(self):
         super().__init__()
-        self._callbacks: Dict[str, List[Callback]] = defaultdict(list)
-        self._view_binding_callbacks_enabled = defaultdict(lambda: True)
+        # Registered callbacks of each property, in registration order
+        self._callbacks: Dict[str, Dict[Callback, None]] = defaultdict(dict)
+        self._change_callbacks: Dict[str, Dict[Callback, None]] = defaultdict(dict)
+        # Up-to-date dispatch tables; a property's table is removed when its callbacks change
+        self._dispatch_tables: Dict[str, DispatchTable] = {}
+        self._registry_lock = threading.Lock()
+        # (registry, property name, callback) of weak callbacks whose referent has been garbage collected
+        self._collected_callbacks: List[Tuple[Dict[str, Dict[Callback, None]], str, Callback]] = []
+        self._suppressed_notifications: Dict[str, int] = defaultdict(int)
+        # (property, thread) pairs whose writes aren't notified to view bindings, i.e. writes made by a view binding
+        self._view_bindings_disabled: Set[Tuple[str, int]] = set()
+        # Thread-safe mode: per-property locks, and sequence numbers which are odd while a write is in progress. The
+        # version of a property is half its sequence number.
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_lock = threading.Lock()
+        self._sequence_numbers: Dict[str, int] = {}
+        # Computed property state, and the computed properties which depend on each property
+        self._computed: Dict[str, _ComputedValue] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._batch_state = _BatchState()
 
     def add_callback(
             self,
             prop: property,
             f: Callable[[], None],
             on_main_thread=False,
-            is_view_binding=False
-    ) -> None:
+            is_view_binding=False,
+            weak=False,
+            executor: Optional['Executor'] = None,
+            policy: str = 'all',
+            result: Optional[property] = None
+    ) -> Disposable:
         """
         Calls a function when a property is updated.
         Parameters
@@ -37,12 +305,34 @@ class Observable:
                          instance exists.
         is_view_binding: If true, this callback is *not* called if the property is modified as a part of a binding
                           update (originating from the view). Prevents cyclical updates.
+        weak:           If true, only a weak reference to f (or, for bound methods, its object) is held. The callback
+                         is removed once f is garbage collected.
+
+        executor:       If given, f is called as f(value of prop) on this executor (e.g. a thread or process pool)
+                         instead of being called directly, so slow callbacks don't block the thread which set prop.
+        policy:         For executor callbacks: 'all' to report the result of every run, or 'latest' to cancel (or drop
+                         the results of) runs superseded by a newer change of prop.
+        result:         For executor callbacks: property of this model which is set to the value returned by f. It is
+                         set on the GUI thread if on_main_thread is true.
+
+        f may be a coroutine function, in which case each call is run as a task on the asyncio event loop (see aio).
+
+        Returns a Disposable which removes the callback.
         """
-        self._callbacks[prop.fset.__name__].append(Callback(f=f,
-                                                            run_in_main_thread=on_main_thread,
-                                                            is_view_binding=False))
+        if executor is not None:
+            if policy not in ('all', 'latest'):
+                raise ValueError(f'Unknown policy "{policy}", expected "all" or "latest"')
+            if weak:
+                raise ValueError('Executor callbacks cannot be weak')
+            on_result = None
+            if result is not None:
+                set_result = result.fset.__get__(self)
+                on_result = _main_thread_callable(set_result) if on_main_thread else set_result
+            f = _ExecutorCallback(f, prop.fget.__get__(self), executor, policy == 'latest', on_result)
+            on_main_thread = False
+        return self._register(self._callbacks, prop, f, on_main_thread, False, weak)
 
-    def _add_binding_callback(self, prop: property, f: Callable[[], None]):
+    def _add_binding_callback(self, prop: property, f: Callable[[], None]) -> Disposable:
         """
         Calls a function when a property is updated. This callback is disabled by calling _disable_view_bindings.
         Parameters
@@ -51,48 +341,447 @@ class Observable:
         f:              The function called when prop is changed (i.e. the callback).
         """
         # No need to run callback on main thread as QWidgetUpdater (in bindings) already takes care of that.
-        self._callbacks[prop.fset.__name__].append(Callback(f=f,
-                                                            run_in_main_thread=False,
-                                                            is_view_binding=True))
+        return self._register(self._callbacks, prop, f, False, True)
+
+    def add_change_callback(
+            self,
+            prop: property,
+            f: Callable[[Change], None],
+            on_main_thread=False,
+            weak=False
+    ) -> Disposable:
+        """
+        Calls a function with a Change when a property is updated. If the property holds an ObservableList or
+        ObservableDict, modifications of the collection are described by fine-grained Changes (e.g. an insertion);
+        otherwise, and when the property is reassigned, the Change is a reset.
+        Parameters
+        ----------
+        prop:           The property which triggers the callback when modified.
+        f:              The function called with the Change when prop is changed (i.e. the callback).
+        on_main_thread: Callback is guaranteed to be executed on the GUI thread if true and a QT Application
+                         instance exists.
+        weak:           If true, only a weak reference to f is held (see add_callback).
+
+        Returns a Disposable which removes the callback.
+        """
+        return self._register(self._change_callbacks, prop, f, on_main_thread, False, weak)
+
+    def _add_binding_change_callback(self, prop: property, f: Callable[[Change], None]) -> Disposable:
+        """
+        As add_change_callback, but the callback is disabled by calling _disable_view_bindings.
+        """
+        return self._register(self._change_callbacks, prop, f, False, True)
+
+    def _register(self,
+                  registry: Dict[str, Dict[Callback, None]],
+                  prop: property,
+                  f: Callable[..., None],
+                  run_in_main_thread: bool,
+                  is_view_binding: bool,
+                  weak: bool = False) -> Disposable:
+        property_name = prop.fset.__name__
+        handle = Disposable()
+        is_coroutine = inspect.iscoroutinefunction(f)
+        callback = Callback(f=f, run_in_main_thread=run_in_main_thread, is_view_binding=is_view_binding)
+        if weak:
+            # Called by the garbage collector, possibly while this thread holds _registry_lock, so the callback is only
+            # queued for removal rather than unregistered here.
+            f = _weak_callable(f, partial(self._collected_callbacks.append, (registry, property_name, callback)))
+        if is_coroutine:
+            f = _coroutine_callable(f)
+        callback.f = f
+        with self._registry_lock:
+            self._remove_collected_callbacks()
+            registry[property_name][callback] = None
+            self._dispatch_tables.pop(property_name, None)
+        handle.add(partial(self._unregister, registry, property_name, callback))
+        if getattr(prop.fget, 'is_computed', False):
+            # Evaluate once so that dependencies are known, and changes are propagated to the callback.
+            getattr(self, property_name)
+        return handle
+
+    def _unregister(self,
+                    registry: Dict[str, Dict[Callback, None]],
+                    property_name: str,
+                    callback: Callback) -> None:
+        with self._registry_lock:
+            callbacks = registry.get(property_name)
+            if callbacks is not None and callback in callbacks:
+                del callbacks[callback]
+                self._dispatch_tables.pop(property_name, None)
+
+    def _remove_collected_callbacks(self) -> None:
+        # Must be called with _registry_lock held
+        collected = self._collected_callbacks
+        while collected:
+            registry, property_name, callback = collected.pop()
+            callbacks = registry.get(property_name)
+            if callbacks is not None and callback in callbacks:
+                del callbacks[callback]
+                self._dispatch_tables.pop(property_name, None)
+
+    def _dispatch_table(self, property_name: str) -> DispatchTable:
+        table = self._dispatch_tables.get(property_name)
+        if table is None or self._collected_callbacks:
+            with self._registry_lock:
+                self._remove_collected_callbacks()
+                table = self._dispatch_tables.get(property_name)
+                if table is None:
+                    table = self._dispatch_tables[property_name] = DispatchTable(
+                        self._callbacks.get(property_name, ()),
+                        self._change_callbacks.get(property_name, ()))
+        return table
 
     def _disable_view_bindings(self, prop: property) -> None:
-        self._view_binding_callbacks_enabled[prop.fset.__name__] = False
+        # Only for the calling thread, so that concurrent writes from other threads still update the view.
+        self._view_bindings_disabled.add((prop.fset.__name__, threading.get_ident()))
 
     def _enable_view_bindings(self, prop: property) -> None:
-        self._view_binding_callbacks_enabled[prop.fset.__name__] = True
+        self._view_bindings_disabled.discard((prop.fset.__name__, threading.get_ident()))
+
+    def _includes_view_bindings(self, property_name: str) -> bool:
+        disabled = self._view_bindings_disabled
+        return not disabled or (property_name, threading.get_ident()) not in disabled
+
+    def _property_lock(self, property_name: str) -> threading.RLock:
+        lock = self._locks.get(property_name)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(property_name, threading.RLock())
+        return lock
+
+    def version(self, prop: property) -> int:
+        """
+        Number of writes of prop so far. Only counted for thread_safe models.
+        """
+        return self._sequence_numbers.get(prop.fset.__name__, 0) // 2
+
+    def versioned(self, prop: property) -> Tuple[int, Any]:
+        """
+        Returns the version and value of prop, read consistently (i.e. the value was written by that version).
+        """
+        name = prop.fset.__name__
+        sequence_numbers = self._sequence_numbers
+        sequence_number = sequence_numbers.get(name, 0)
+        if not sequence_number & 1:
+            value = getattr(self, name)
+            if sequence_numbers.get(name, 0) == sequence_number:
+                return sequence_number // 2, value
+        # Write in progress
+        with self._property_lock(name):
+            return sequence_numbers.get(name, 0) // 2, getattr(self, name)
+
+    def _set_locked(self, name: str, func: Callable, args: tuple, kwargs: dict, compare: Optional[Comparator]) -> None:
+        # Thread-safe version of the @observable setter wrapper
+        with self._property_lock(name):
+            old = getattr(self, name, _MISSING) if compare is not None else _MISSING
+            sequence_numbers = self._sequence_numbers
+            sequence_number = sequence_numbers.get(name, 0) | 1
+            sequence_numbers[name] = sequence_number
+            try:
+                func(*args, **kwargs)
+            finally:
+                sequence_numbers[name] = sequence_number + 1
+            val = args[1]
+            if isinstance(val, ObservableCollection):
+                # noinspection PyProtectedMember
+                val._attach(self, name)
+            if old is not _MISSING and compare(old, getattr(self, name)):
+                self._suppressed_notifications[name] += 1
+                return
+        # Notify outside the lock; observers use versions to ignore notifications which arrive out of order.
+        self._notify(name)
+
+    def changed(self, prop: property, predicate: Optional[Callable[[Any], bool]] = None) -> 'asyncio.Future':
+        """
+        Returns an awaitable which completes with the new value of prop the next time it changes (to a value for which
+        predicate is true, if given). Must be called within a running asyncio event loop. The property may be changed
+        from any thread.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        getter = prop.fget.__get__(self)
+
+        def on_change():
+            value = getter()
+            if predicate is None or predicate(value):
+                handle.dispose()
+                loop.call_soon_threadsafe(_set_result, future, value)
+
+        handle = self.add_callback(prop, on_change)
+        # Also removes the callback if the awaiting task is cancelled
+        future.add_done_callback(handle.dispose)
+        return future
+
+    @property
+    def suppressed_notifications(self) -> Dict[str, int]:
+        """
+        Number of notifications skipped per property because the value was unchanged.
+        """
+        return dict(self._suppressed_notifications)
+
+    @classmethod
+    def observable_properties(cls) -> Tuple[str, ...]:
+        """
+        Names of the class's properties with @observable setters (so excluding computed properties), in definition
+        order. Looked up once per class.
+        """
+        try:
+            return Observable._observable_property_cache[cls]
+        except KeyError:
+            pass
+        names = {}
+        for klass in reversed(cls.mro()):
+            for name, attribute in vars(klass).items():
+                if type(attribute) is property and getattr(attribute.fset, 'is_observable', False):
+                    names[name] = None
+                else:
+                    # Overridden by a non-observable attribute
+                    names.pop(name, None)
+        names = Observable._observable_property_cache[cls] = tuple(names)
+        return names
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the values of all observable properties. Values are not copied, so collections or arrays which are later
+        modified in place will be modified in the snapshot too.
+
+        For thread_safe models, the values are consistent: no write was in progress or made while they were read. Reads
+        are retried if a write interferes, and only lock out writers if they keep interfering.
+        """
+        names = self.observable_properties()
+        if not self.thread_safe:
+            return {name: getattr(self, name) for name in names}
+        sequence_numbers = self._sequence_numbers
+        for _ in range(8):
+            before = [sequence_numbers.get(name, 0) for name in names]
+            if any(n & 1 for n in before):
+                continue
+            values = {name: getattr(self, name) for name in names}
+            if [sequence_numbers.get(name, 0) for name in names] == before:
+                return values
+        # Lock in a fixed order, so that concurrent snapshots can't deadlock
+        locks = [self._property_lock(name) for name in sorted(names)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            return {name: getattr(self, name) for name in names}
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Sets the observable properties in snapshot (e.g. from `snapshot()`). Observers are notified once all have been
+        set, and only of properties whose value changed.
+        """
+        names = self.observable_properties()
+        # Checked first, so that an invalid snapshot doesn't leave the model partially restored
+        for name in snapshot:
+            if name not in names:
+                raise AttributeError(f'"{type(self).__name__}.{name}" is not an observable property')
+        with self.deferred_notifications():
+            for name, value in snapshot.items():
+                setattr(self, name, value)
 
     def remove_all_callbacks(self) -> None:
         self._callbacks.clear()
-        self._view_binding_callbacks_enabled.clear()
+        self._change_callbacks.clear()
+        self._dispatch_tables.clear()
+        self._collected_callbacks.clear()
+        self._view_bindings_disabled.clear()
+
+    @contextmanager
+    def deferred_notifications(self):
+        """
+        Defers notifications until the outermost deferred block exits. Each modified property is then notified once,
+        in the order it was first modified, regardless of how many times it was written. Blocks may be nested.
+        Only the calling thread's writes are deferred; other threads' writes are notified as usual.
+        """
+        state = self._batch_state
+        state.depth += 1
+        try:
+            yield self
+        finally:
+            state.depth -= 1
+            if state.depth == 0:
+                self._flush_notifications()
+
+    # Shorthand for deferred_notifications
+    batch = deferred_notifications
+
+    def _flush_notifications(self) -> None:
+        # Swap out pending first; callbacks that write to the model are notified as usual (i.e. outside the batch).
+        state = self._batch_state
+        pending = state.pending
+        state.pending = {}
+        for property_name, include_view_bindings in pending.items():
+            self._dispatch(property_name, include_view_bindings)
 
     def _notify(self, property_name: str) -> None:
-        callbacks = self._callbacks[property_name]
+        include_view_bindings = self._includes_view_bindings(property_name)
+        state = self._batch_state
+        if state.depth > 0:
+            # View bindings are notified on flush if any of the batched writes did not originate from the view.
+            pending = state.pending
+            pending[property_name] = pending.get(property_name, False) or include_view_bindings
+            return
+        self._dispatch(property_name, include_view_bindings)
+
+    def _notify_change(self, property_name: str, change: Change) -> None:
+        """
+        Notifies observers of a fine-grained change to a collection held by a property. Within a batch, the change is
+        reported as a reset when the batch is flushed.
+        """
+        if self._batch_state.depth > 0:
+            self._notify(property_name)
+            return
+        self._dispatch(property_name, self._includes_view_bindings(property_name), change)
+
+    def _dispatch(self, property_name: str, include_view_bindings: bool, change: Change = RESET) -> None:
+        self._run_callbacks(property_name, include_view_bindings, change)
+        if property_name in self._dependents:
+            self._propagate(property_name)
+
+    def _run_callbacks(self, property_name: str, include_view_bindings: bool, change: Change) -> None:
+        table = self._dispatch_table(property_name)
         # ignore callbacks which bind this property to the view
-        if not self._view_binding_callbacks_enabled[property_name]:
-            callbacks = (c for c in callbacks if not c.is_view_binding)
-
-        # Execute remaining callbacks
-        for callback in callbacks:
-            f = callback.f
-            if callback.run_in_main_thread:
-                MainThread.execute(f)
-            else:
+        if include_view_bindings:
+            for f in table.all:
+                f()
+            for f in table.change_all:
+                f(change)
+        else:
+            for f in table.non_view:
                 f()
+            for f in table.change_non_view:
+                f(change)
+
+    def _get_computed(self, property_name: str, func: Callable[[Any], Any], compare: Optional[Comparator]):
+        state = self._computed.get(property_name)
+        if state is None:
+            state = self._computed[property_name] = _ComputedValue(compare)
+        if state.valid:
+            return state.value
+
+        dependencies = set()
+        value = func(_DependencyRecorder(self, dependencies))
+        self._set_dependencies(property_name, state, frozenset(dependencies))
+        state.value = value
+        state.valid = state.has_value = True
+        return value
 
+    def _set_dependencies(self, property_name: str, state: _ComputedValue, dependencies: frozenset) -> None:
+        for removed in state.dependencies - dependencies:
+            dependents = self._dependents[removed]
+            dependents.discard(property_name)
+            if not dependents:
+                del self._dependents[removed]
+        for added in dependencies - state.dependencies:
+            self._dependents.setdefault(added, set()).add(property_name)
+        state.dependencies = dependencies
+
+    def _propagate(self, property_name: str) -> None:
+        """
+        Invalidates all computed properties which (transitively) depend on property_name, then recomputes those with
+        callbacks in topological order, notifying if their value changed. Unobserved computed properties are recomputed
+        lazily, when next read.
+        """
+        # Reverse DFS post-order, so that each computed property comes after all of its dependencies
+        order = []
+        visited = set()
+
+        def visit(name):
+            for dependent in self._dependents.get(name, ()):
+                if dependent not in visited:
+                    visited.add(dependent)
+                    visit(dependent)
+                    order.append(dependent)
+
+        visit(property_name)
+        order.reverse()
+
+        for name in order:
+            self._computed[name].valid = False
+        for name in order:
+            table = self._dispatch_table(name)
+            if not (table.all or table.change_all):
+                continue
+            state = self._computed[name]
+            had_value, old = state.has_value, state.value
+            new = getattr(self, name)
+            if had_value and state.compare is not None and state.compare(old, new):
+                self._suppressed_notifications[name] += 1
+                continue
+            self._run_callbacks(name, True, RESET)
+
+
+_MISSING = object()
+
+
+def observable(func=None, *, compare: Optional[Comparator] = equal):
+    """
+    Decorates a property setter so that observers are notified after it runs. Observers are not notified if compare
+    (old value, new value) is true. Use compare=None to always notify, e.g. if values are mutated in place.
+    Can be used bare (`@observable`) or with arguments (`@observable(compare=array_equal)`).
+    """
+    if func is None:
+        return functools.partial(observable, compare=compare)
+    name = func.__name__
 
-def observable(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        if getattr(args[0], 'thread_safe', False):
+            # noinspection PyProtectedMember
+            return args[0]._set_locked(name, func, args, kwargs, compare)
+        if compare is not None:
+            old = getattr(args[0], name, _MISSING)
+
         # Run setter
         func(*args, **kwargs)
 
         # Notify observers of update
         try:
             self, val = args
-            # val is unused for the sake of symmetry with QT
-            self._notify(func.__name__)
+            if isinstance(val, ObservableCollection):
+                # Collections notify of their own modifications from now on
+                # noinspection PyProtectedMember
+                val._attach(self, name)
+            if compare is not None and old is not _MISSING and compare(old, getattr(self, name)):
+                self._suppressed_notifications[name] += 1
+                return
+            self._notify(name)
         except AttributeError:
             print(f'WARNING: no observers set for {func}. '
                   f'Did you use the Observers mixin?')
 
+    wrapper.is_observable = True
     return wrapper
+
+
+def computed(func=None, *, compare: Optional[Comparator] = equal):
+    """
+    Decorates a getter to create a read-only, cached property of an Observable, derived from other properties. The
+    properties read by the getter are recorded as its dependencies; when any changes, the cached value is invalidated
+    and recomputed when next read. Observers of the computed property are notified (once, after its dependencies have
+    been updated) only if compare(old value, new value) is false.
+    Only properties accessed directly on `self` within the getter are recorded (not those read within other methods).
+    Can be used bare (`@computed`) or with arguments (`@computed(compare=array_equal)`).
+    """
+    if func is None:
+        return functools.partial(computed, compare=compare)
+    name = func.__name__
+
+    @functools.wraps(func)
+    def getter(self):
+        # noinspection PyProtectedMember
+        return self._get_computed(name, func, compare)
+
+    def setter(self, val):
+        raise AttributeError(f'Computed property "{name}" is read-only')
+
+    getter.is_computed = True
+    # Properties are identified by setter name elsewhere
+    setter.__name__ = name
+    return property(getter, setter, doc=func.__doc__)
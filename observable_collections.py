@@ -0,0 +1,236 @@
+import weakref
+from collections.abc import MutableSequence, MutableMapping
+from dataclasses import dataclass
+from typing import Any, Tuple, List, Iterable, Dict
+
+
+@dataclass(frozen=True)
+class Change:
+    """
+    Describes a single modification of an observable collection.
+
+    kind:           One of 'insert', 'remove', 'replace', 'move' or 'reset'. A reset means the whole value may have
+                     changed (e.g. the property was reassigned or the list was sorted).
+    index:          First list index affected (lists only).
+    items:          Inserted, removed or replacement items. For dicts, the (single) new value of key.
+    destination:    Index of the moved item after the move (move only).
+    key:            Affected key (dicts only).
+    old_items:      Items which were replaced (replace only), so that the change can be reverted.
+    """
+    kind: str
+    index: int = 0
+    items: Tuple = ()
+    destination: int = 0
+    key: Any = None
+    old_items: Tuple = ()
+
+
+RESET = Change('reset')
+
+
+class ObservableCollection:
+    """
+    Base for collections which notify the models (and properties) they are assigned to of fine-grained changes. A
+    collection is attached to a model when assigned through an @observable setter.
+    """
+
+    def __init__(self):
+        self._owners: List[Tuple[weakref.ref, str]] = []
+
+    def _attach(self, model, property_name: str) -> None:
+        for ref, name in self._owners:
+            if ref() is model and name == property_name:
+                return
+        self._owners.append((weakref.ref(model), property_name))
+
+    def _emit(self, change: Change) -> None:
+        for owner in tuple(self._owners):
+            ref, name = owner
+            model = ref()
+            # Detach lazily from models which were collected or whose property has since been reassigned.
+            if model is None or getattr(model, name, None) is not self:
+                self._owners.remove(owner)
+                continue
+            # noinspection PyProtectedMember
+            model._notify_change(name, change)
+
+
+class ObservableList(ObservableCollection, MutableSequence):
+    """
+    List which reports insertions, removals, replacements and moves to its owning models as Changes, so observers can
+    update incrementally rather than processing the whole list.
+    """
+
+    def __init__(self, items: Iterable = ()):
+        super().__init__()
+        self._items = list(items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, value) -> bool:
+        return value in self._items
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ObservableList):
+            return self._items == other._items
+        if isinstance(other, list):
+            return self._items == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self._items!r})'
+
+    def _normalise(self, index: int) -> int:
+        n = len(self._items)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('list index out of range')
+        return index
+
+    def __setitem__(self, index, value) -> None:
+        if not isinstance(index, slice):
+            index = self._normalise(index)
+            old = self._items[index]
+            self._items[index] = value
+            self._emit(Change('replace', index, (value,), old_items=(old,)))
+            return
+        start, _, step = index.indices(len(self._items))
+        value = tuple(value)
+        replaced = self._items[index]
+        self._items[index] = value
+        if step != 1:
+            self._emit(RESET)
+            return
+        n_replaced = min(len(replaced), len(value))
+        if n_replaced:
+            self._emit(Change('replace', start, value[:n_replaced], old_items=tuple(replaced[:n_replaced])))
+        if len(replaced) > n_replaced:
+            self._emit(Change('remove', start + n_replaced, tuple(replaced[n_replaced:])))
+        elif len(value) > n_replaced:
+            self._emit(Change('insert', start + n_replaced, value[n_replaced:]))
+
+    def __delitem__(self, index) -> None:
+        if not isinstance(index, slice):
+            index = self._normalise(index)
+            removed = self._items.pop(index)
+            self._emit(Change('remove', index, (removed,)))
+            return
+        start, _, step = index.indices(len(self._items))
+        removed = tuple(self._items[index])
+        del self._items[index]
+        if step != 1:
+            self._emit(RESET)
+        elif removed:
+            self._emit(Change('remove', start, removed))
+
+    def insert(self, index: int, value) -> None:
+        n = len(self._items)
+        index = max(0, min(n, index + n if index < 0 else index))
+        self._items.insert(index, value)
+        self._emit(Change('insert', index, (value,)))
+
+    def append(self, value) -> None:
+        self._items.append(value)
+        self._emit(Change('insert', len(self._items) - 1, (value,)))
+
+    def extend(self, values: Iterable) -> None:
+        values = tuple(values)
+        if not values:
+            return
+        start = len(self._items)
+        self._items.extend(values)
+        self._emit(Change('insert', start, values))
+
+    def __iadd__(self, values: Iterable):
+        self.extend(values)
+        return self
+
+    def pop(self, index: int = -1):
+        index = self._normalise(index)
+        removed = self._items.pop(index)
+        self._emit(Change('remove', index, (removed,)))
+        return removed
+
+    def clear(self) -> None:
+        if not self._items:
+            return
+        removed = tuple(self._items)
+        self._items.clear()
+        self._emit(Change('remove', 0, removed))
+
+    def move(self, source: int, destination: int) -> None:
+        """
+        Moves the item at source so that it ends up at destination.
+        """
+        source = self._normalise(source)
+        destination = self._normalise(destination)
+        if source == destination:
+            return
+        self._items.insert(destination, self._items.pop(source))
+        self._emit(Change('move', source, destination=destination))
+
+    def sort(self, *args, **kwargs) -> None:
+        self._items.sort(*args, **kwargs)
+        self._emit(RESET)
+
+    def reverse(self) -> None:
+        self._items.reverse()
+        self._emit(RESET)
+
+
+class ObservableDict(ObservableCollection, MutableMapping):
+    """
+    Dict which reports insertions, removals and replacements of keys to its owning models as Changes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._items: Dict = dict(*args, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ObservableDict):
+            return self._items == other._items
+        if isinstance(other, dict):
+            return self._items == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self._items!r})'
+
+    def __setitem__(self, key, value) -> None:
+        if key in self._items:
+            change = Change('replace', items=(value,), key=key, old_items=(self._items[key],))
+        else:
+            change = Change('insert', items=(value,), key=key)
+        self._items[key] = value
+        self._emit(change)
+
+    def __delitem__(self, key) -> None:
+        removed = self._items.pop(key)
+        self._emit(Change('remove', items=(removed,), key=key))
+
+    def clear(self) -> None:
+        if not self._items:
+            return
+        self._items.clear()
+        self._emit(RESET)
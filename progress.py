@@ -0,0 +1,150 @@
+"""
+Progress of work shared between many worker threads.
+
+Workers count completed items in per-thread counters, which aren't shared, so counting needs no locks and doesn't
+notify. A sampler thread periodically sums the counters into the observable `value` and `maximum` properties, which
+can be bound to a QProgressBar (see `Binder.progress_bar`).
+"""
+import threading
+from typing import List, Optional
+
+from .observable import Observable, observable
+
+
+class ProgressCounter:
+    """
+    A single thread's share of a Progress. Must only be used by the thread which created it.
+    """
+    __slots__ = ('_cell',)
+
+    def __init__(self, cell: List[int]):
+        self._cell = cell
+
+    def advance(self, n: int = 1) -> None:
+        """
+        Counts n more items as done.
+        """
+        self._cell[0] += n
+
+    def add_total(self, n: int) -> None:
+        """
+        Counts n more items to be done.
+        """
+        self._cell[1] += n
+
+
+class Progress(Observable):
+    """
+    Aggregated progress of many workers, sampled into the `value` and `maximum` properties at most max_update_rate
+    times per second while started.
+
+    Parameters
+    ----------
+    total : int
+        Number of items to be done. Workers can add to it with `add_total`.
+    max_update_rate : float
+        Samples per second.
+    """
+
+    def __init__(self, total: int = 0, max_update_rate: float = 30.0):
+        super().__init__()
+        self._value = 0
+        self._maximum = total
+        self.total = total
+        self.max_update_rate = max_update_rate
+        # [done, added total] of each thread which has counted, appended under _cells_lock
+        self._cells: List[List[int]] = []
+        self._cells_lock = threading.Lock()
+        self._local = threading.local()
+        self._stop: Optional[threading.Event] = None
+        # Sampling is the only writer of value and maximum
+        self._sample_lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    @value.setter
+    @observable
+    def value(self, val: int) -> None:
+        self._value = val
+
+    @property
+    def maximum(self) -> int:
+        return self._maximum
+
+    @maximum.setter
+    @observable
+    def maximum(self, val: int) -> None:
+        self._maximum = val
+
+    def counter(self) -> ProgressCounter:
+        """
+        The calling thread's counter. Holding on to it avoids the thread-local lookup of `advance` in tight loops.
+        """
+        try:
+            return self._local.counter
+        except AttributeError:
+            pass
+        cell = [0, 0]
+        with self._cells_lock:
+            self._cells.append(cell)
+        counter = self._local.counter = ProgressCounter(cell)
+        return counter
+
+    def advance(self, n: int = 1) -> None:
+        """
+        Counts n more items as done by the calling thread.
+        """
+        self.counter().advance(n)
+
+    def add_total(self, n: int) -> None:
+        """
+        Counts n more items to be done.
+        """
+        self.counter().add_total(n)
+
+    def sample(self) -> None:
+        """
+        Sums all threads' counters into `value` and `maximum`, notifying once.
+        """
+        with self._sample_lock:
+            done = total = 0
+            for cell in tuple(self._cells):
+                done += cell[0]
+                total += cell[1]
+            with self.deferred_notifications():
+                # Maximum first, as progress bars ignore values above their maximum
+                self.maximum = self.total + total
+                self.value = done
+
+    def start(self) -> None:
+        """
+        Starts sampling on a background thread.
+        """
+        self.stop()
+        stop = self._stop = threading.Event()
+        interval = 1 / self.max_update_rate
+
+        def run():
+            while not stop.wait(interval):
+                self.sample()
+
+        threading.Thread(target=run, name='progress-sampler', daemon=True).start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling, after taking a final sample.
+        """
+        if self._stop is None:
+            return
+        self._stop.set()
+        self._stop = None
+        self.sample()
+
+    def __enter__(self) -> 'Progress':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,104 @@
+"""
+The Qt binding used by the Qt-dependent modules (bindings, widgets and MainThread), which is imported on first use
+rather than when the package is imported, so that models and controllers can be used without Qt.
+
+The binding is, in order of precedence: the one chosen with `use()`; the QT_API environment variable ('pyside2' or
+'pyside6'); one which has already been imported; or the first of PySide2 and PySide6 which is installed. Qt classes are
+imported from this module, e.g. `from .qt import QTimer, QWidget`.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+from typing import Dict, Optional
+
+APIS = ('PySide2', 'PySide6')
+_MODULES = ('QtCore', 'QtGui', 'QtWidgets')
+
+_api: Optional[str] = None
+_namespace: Optional[Dict[str, object]] = None
+
+
+def use(api: str) -> None:
+    """
+    Chooses the Qt binding, 'PySide2' or 'PySide6'. Must be called before any Qt-dependent module is used.
+    """
+    global _api
+    api = _canonical(api)
+    if _namespace is not None and api != _api:
+        raise RuntimeError(f'Qt binding {_api} is already in use')
+    _api = api
+
+
+def api() -> str:
+    """
+    Name of the Qt binding in use, or which will be used.
+    """
+    global _api
+    if _api is None:
+        _api = _detect()
+    return _api
+
+
+def version() -> str:
+    """
+    Version of the Qt binding in use.
+    """
+    return importlib.import_module(api()).__version__
+
+
+def is_loaded() -> bool:
+    """
+    Whether the Qt binding has been imported by this package yet.
+    """
+    return _namespace is not None
+
+
+def is_imported() -> bool:
+    """
+    Whether a Qt binding has been imported, by this package or by the application.
+    """
+    return _namespace is not None or any(name in sys.modules for name in APIS)
+
+
+def _canonical(api: str) -> str:
+    for name in APIS:
+        if name.lower() == api.lower():
+            return name
+    raise ValueError(f'Unsupported Qt binding "{api}"; expected one of {APIS}')
+
+
+def _detect() -> str:
+    requested = os.environ.get('QT_API')
+    if requested:
+        return _canonical(requested)
+    for name in APIS:
+        if name in sys.modules:
+            return name
+    for name in APIS:
+        if importlib.util.find_spec(name) is not None:
+            return name
+    raise ImportError(f'No Qt binding found; install one of {APIS}')
+
+
+def _load() -> Dict[str, object]:
+    global _namespace
+    if _namespace is None:
+        binding = api()
+        _namespace = {module_name: importlib.import_module(f'{binding}.{module_name}') for module_name in _MODULES}
+    return _namespace
+
+
+def __getattr__(name: str):
+    # Qt modules and classes, e.g. QtWidgets or QTimer. Dunder lookups (e.g. by inspection tools) don't import Qt.
+    if not name.startswith('__'):
+        namespace = _load()
+        if name in namespace:
+            return namespace[name]
+        # Looked up by attribute, as PySide6 creates its classes on first access
+        for module_name in _MODULES:
+            value = getattr(namespace[module_name], name, None)
+            if value is not None:
+                namespace[name] = value
+                return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
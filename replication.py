@@ -0,0 +1,200 @@
+"""
+Replication of an Observable's properties into a child process, so that heavy computation on model state can run on
+another core.
+
+The child receives a copy of the model with the replicated properties set. From then on, only changed properties are
+sent, in either direction: writes in the parent are applied to the child's model, and writes in the child are applied
+to the parent's model, notifying its observers as usual. Large NumPy arrays are passed through shared memory, and are
+mapped (not copied) by the receiving process.
+"""
+import multiprocessing
+import threading
+import weakref
+from collections import namedtuple
+from functools import partial
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterable, Optional, Tuple, Dict
+
+from .observable import Observable, Disposable
+
+
+class _SharedArray(namedtuple('SharedArray', 'name shape dtype')):
+    """
+    Reference to an array in a shared memory block, which is unlinked by the receiving process once opened.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, array) -> '_SharedArray':
+        import numpy as np
+        shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+        shared = cls(shm.name, array.shape, array.dtype.str)
+        shm.close()
+        return shared
+
+    def open(self):
+        import numpy as np
+        shm = SharedMemory(self.name)
+        # The name is no longer needed once mapped; the memory is released once the array is
+        shm.unlink()
+        array = np.ndarray(self.shape, np.dtype(self.dtype), buffer=shm.buf)
+        weakref.finalize(array, shm.close)
+        return array
+
+
+def _encode(value, shared_memory_threshold: int):
+    nbytes = getattr(value, 'nbytes', None)
+    if (type(nbytes) is int and nbytes >= shared_memory_threshold and hasattr(value, '__array_interface__')
+            and not value.dtype.hasobject):
+        return _SharedArray.create(value)
+    return value
+
+
+def _decode(value):
+    return value.open() if type(value) is _SharedArray else value
+
+
+class _Link:
+    """
+    One end of a replica: sends changes of the model's replicated properties through conn, and applies changes
+    received from the other end.
+    """
+
+    def __init__(self, model: Observable, names: Tuple[str, ...], conn: Connection, shared_memory_threshold: int):
+        self.model = model
+        self.names = names
+        self.conn = conn
+        self.shared_memory_threshold = shared_memory_threshold
+        self._send_lock = threading.Lock()
+        # Name of the property being set on the receiving thread, so that received changes aren't sent back
+        self._receiving = threading.local()
+        model_type = type(model)
+        self._subscription = Disposable(*(
+            model.add_callback(getattr(model_type, name), partial(self._send, name)).dispose for name in names
+        ))
+        self._receiver = threading.Thread(target=self._receive, name=f'{model_type.__name__}-replica', daemon=True)
+
+    def start(self) -> None:
+        self._receiver.start()
+
+    def _send(self, name: str) -> None:
+        if getattr(self._receiving, 'name', None) == name:
+            return
+        value = _encode(getattr(self.model, name), self.shared_memory_threshold)
+        try:
+            with self._send_lock:
+                self.conn.send((name, value))
+        except (OSError, ValueError):
+            # Other end has closed
+            self._subscription.dispose()
+
+    def _receive(self) -> None:
+        model = self.model
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            name, value = message
+            self._receiving.name = name
+            try:
+                setattr(model, name, _decode(value))
+            finally:
+                self._receiving.name = None
+        # Closing this end stops the other end's receiver too
+        self._subscription.dispose()
+        self.conn.close()
+
+    def close(self) -> None:
+        """
+        Stops sending changes, and asks the other end to close.
+        """
+        self._subscription.dispose()
+        try:
+            with self._send_lock:
+                self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+
+
+def _run_child(conn: Connection,
+               model_type: type,
+               initial: Dict[str, Any],
+               target: Callable[..., None],
+               args: tuple,
+               shared_memory_threshold: int) -> None:
+    # Models are created without calling __init__, so only the replicated properties are set.
+    model = model_type.__new__(model_type)
+    Observable.__init__(model)
+    for name, value in initial.items():
+        getattr(model_type, name).fset(model, _decode(value))
+    link = _Link(model, tuple(initial), conn, shared_memory_threshold)
+    link.start()
+    try:
+        target(model, *args)
+    finally:
+        link.close()
+
+
+class ProcessReplica:
+    """
+    Runs target(replica, *args) in a child process, where replica is an instance of the model's class holding the
+    replicated properties. Changed properties are sent between the two models until either side closes.
+
+    Changes received from the child are applied to the model on a background thread, so its observers are called
+    there (as they would be for writes from a worker thread). The model's class must be importable by the child
+    process, and target and args picklable.
+
+    Parameters
+    ----------
+    model : Observable
+        Model to replicate.
+    props : Iterable[property]
+        Observable properties of the model to replicate.
+    target : Callable
+        Function run in the child process.
+    args : tuple
+        Further arguments of target.
+    shared_memory_threshold : int
+        NumPy arrays of at least this many bytes are passed through shared memory instead of the pipe.
+    context : str, optional
+        multiprocessing start method, e.g. 'spawn'. Defaults to the platform's default.
+    """
+
+    def __init__(self,
+                 model: Observable,
+                 props: Iterable[property],
+                 target: Callable[..., None],
+                 args: tuple = (),
+                 shared_memory_threshold: int = 64 * 1024,
+                 context: Optional[str] = None):
+        names = tuple(prop.fset.__name__ for prop in props)
+        ctx = multiprocessing.get_context(context)
+        conn, child_conn = ctx.Pipe()
+        initial = {name: _encode(getattr(model, name), shared_memory_threshold) for name in names}
+        self.process = ctx.Process(target=_run_child,
+                                   args=(child_conn, type(model), initial, target, args, shared_memory_threshold),
+                                   daemon=True)
+        self._link = _Link(model, names, conn, shared_memory_threshold)
+        self.process.start()
+        child_conn.close()
+        self._link.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for the child process to finish, and for its changes to be applied.
+        """
+        self.process.join(timeout)
+        # noinspection PyProtectedMember
+        self._link._receiver.join(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops replicating in both directions, and waits for the child process to finish.
+        """
+        self._link.close()
+        self.join(timeout)
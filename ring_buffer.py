@@ -0,0 +1,83 @@
+from typing import Iterable
+
+
+class RingBuffer:
+    """
+    Fixed capacity buffer of the most recent samples of a stream, backed by a preallocated NumPy array. Appending is
+    O(1) and never allocates; once full, the oldest samples are overwritten.
+
+    Intended for a single writing thread. Readers on other threads (e.g. a plot widget) may see a sample being
+    overwritten while they copy the buffer, which is harmless for display.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of samples kept.
+    dtype :
+        NumPy dtype of the samples.
+    """
+
+    def __init__(self, capacity: int, dtype=float):
+        import numpy as np
+        if capacity < 1:
+            raise ValueError('RingBuffer capacity must be at least 1')
+        self._data = np.zeros(capacity, dtype)
+        self._end = 0  # Index of the next write
+        self._count = 0
+        # Incremented on every modification, so readers can cheaply check for new samples
+        self.version = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value) -> None:
+        data = self._data
+        data[self._end] = value
+        self._end = (self._end + 1) % len(data)
+        if self._count < len(data):
+            self._count += 1
+        self.version += 1
+
+    def extend(self, values: Iterable) -> None:
+        import numpy as np
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        capacity = len(self._data)
+        if len(values) >= capacity:
+            values = values[-capacity:]
+        n = len(values)
+        if n == 0:
+            return
+        # Write in (at most) two slices, wrapping around the end of the array
+        first = min(n, capacity - self._end)
+        self._data[self._end:self._end + first] = values[:first]
+        self._data[:n - first] = values[first:]
+        self._end = (self._end + n) % capacity
+        self._count = min(capacity, self._count + n)
+        self.version += 1
+
+    def latest(self):
+        """
+        The most recent sample.
+        """
+        if not self._count:
+            raise IndexError('RingBuffer is empty')
+        return self._data[self._end - 1]
+
+    def clear(self) -> None:
+        self._end = 0
+        self._count = 0
+        self.version += 1
+
+    def view(self):
+        """
+        The samples, oldest first, as a new array.
+        """
+        import numpy as np
+        end, count = self._end, self._count
+        if count < len(self._data):
+            return self._data[:count].copy()
+        return np.concatenate((self._data[end:], self._data[:end]))
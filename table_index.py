@@ -0,0 +1,98 @@
+from typing import Callable, Dict, Optional, Sequence
+
+
+class _SortedColumn:
+    __slots__ = ('order', 'sorted_values')
+
+    def __init__(self, order, sorted_values):
+        self.order = order
+        # Sorted copy of the column, to check rows haven't changed since and to merge appended rows into
+        self.sorted_values = sorted_values
+
+    def is_prefix_of(self, values) -> bool:
+        """
+        Whether values are the sorted rows, possibly followed by appended rows.
+        """
+        import numpy as np
+        n_sorted = len(self.order)
+        return len(values) >= n_sorted and np.array_equal(values[:n_sorted][self.order], self.sorted_values)
+
+
+class TableIndex:
+    """
+    Computes the row order of sorted and filtered columnar data, with NumPy. Sort permutations are cached per column;
+    if a column has only had rows appended since it was last sorted, the new rows are sorted and merged into the cached
+    permutation instead of sorting the whole column again. The cache holds a sorted copy of each sorted column; call
+    `evict_stale` when the columns are replaced, so that copies of replaced columns aren't kept.
+
+    Not thread-safe: intended to be used from a single worker thread.
+    """
+
+    def __init__(self):
+        self._sorted: Dict[int, _SortedColumn] = {}
+
+    def clear(self) -> None:
+        self._sorted.clear()
+
+    def evict_stale(self, columns: Sequence[Sequence], keep: Optional[int] = None) -> None:
+        """
+        Drops the cached sort orders of columns which aren't the rows sorted followed by appended rows, except for column
+        keep (e.g. one about to be sorted, which is checked then anyway).
+        """
+        import numpy as np
+        for column, cached in list(self._sorted.items()):
+            if column == keep:
+                continue
+            if column >= len(columns) or not cached.is_prefix_of(np.asarray(columns[column])):
+                del self._sorted[column]
+
+    def row_order(self,
+                  columns: Sequence[Sequence],
+                  sort_column: Optional[int] = None,
+                  descending: bool = False,
+                  predicate: Optional[Callable[[Sequence[Sequence]], Sequence[bool]]] = None):
+        """
+        Returns the indexes of the rows to show, in order, or None to show all rows in their original order.
+
+        Parameters
+        ----------
+        columns : Sequence[Sequence]
+            The table's columns.
+        sort_column : int, optional
+            Index of the column to sort by, or None to keep the original order.
+        descending : bool
+            Sort in descending order.
+        predicate : Callable, optional
+            Given the columns, returns a boolean mask of the rows to show (e.g. `lambda c: c[2] > 0`).
+        """
+        import numpy as np
+        order = None
+        if sort_column is not None:
+            order = self._sort(sort_column, np.asarray(columns[sort_column]))
+            if descending:
+                order = order[::-1]
+        if predicate is not None:
+            mask = np.asarray(predicate(columns), dtype=bool)
+            order = np.flatnonzero(mask) if order is None else order[mask[order]]
+        return order
+
+    def _sort(self, column: int, values):
+        import numpy as np
+        cached = self._sorted.get(column)
+        if cached is not None:
+            n_cached = len(cached.order)
+            if cached.is_prefix_of(values):
+                if len(values) == n_cached:
+                    return cached.order
+                # Merge the sorted new rows into the cached order. Rows equal to existing ones go after them, so the
+                # sort stays stable.
+                tail = values[n_cached:]
+                tail_order = np.argsort(tail, kind='stable')
+                tail_sorted = tail[tail_order]
+                positions = np.searchsorted(cached.sorted_values, tail_sorted, side='right')
+                order = np.insert(cached.order, positions, tail_order + n_cached)
+                self._sorted[column] = _SortedColumn(order, np.insert(cached.sorted_values, positions, tail_sorted))
+                return order
+        order = np.argsort(values, kind='stable')
+        self._sorted[column] = _SortedColumn(order, values[order])
+        return order
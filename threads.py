@@ -1,31 +1,197 @@
-from threading import Lock
-from typing import TypeVar, Optional, Callable, Any
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import TypeVar, Optional, Callable, Any, Deque, Tuple, Iterable
 
-from PySide2 import QtWidgets
-from PySide2.QtCore import QObject, Signal, QThread
-from PySide2.QtWidgets import QWidget
+from . import instrumentation
+from .qt import QtWidgets, QObject, Signal, QThread, QTimer, QWidget
+from .observable_collections import Change
 
 
 class QWidgetUpdater(QObject):
+    """
+    Updates a widget with the model's value on the main thread, when called from any thread.
+
+    If versioned, model_getter returns (version, value) pairs, and values older than the one already retrieved are
+    ignored. Otherwise, concurrent calls from several threads may leave an older value in place of a newer one.
+    """
     _sig_update_widget = Signal()
 
-    def __init__(self, widget: QWidget, widget_setter: Callable[..., None], model_getter: Callable[[], Any]):
+    def __init__(self,
+                 widget: QWidget,
+                 widget_setter: Callable[..., None],
+                 model_getter: Callable[[], Any],
+                 versioned: bool = False):
         super().__init__()
         self._widget = widget
         self._model_getter = model_getter
         self._widget_setter = widget_setter
         self._got = None  # retrieved value from model
+        self._versioned = versioned
+        self._version = -1
+        self._version_lock = threading.Lock() if versioned else None
 
         self._sig_update_widget.connect(self._update_widget)
 
+    def _get(self) -> bool:
+        """
+        Retrieves the model's value. Returns False if it's older than the value already retrieved.
+        """
+        if not self._versioned:
+            self._got = self._model_getter()
+            return True
+        version, value = self._model_getter()
+        with self._version_lock:
+            if version <= self._version:
+                return False
+            self._version = version
+            self._got = value
+        return True
+
     def _update_widget(self):
         self._widget.blockSignals(True)
-        self._widget_setter(self._got)
+        if instrumentation.enabled:
+            start = time.perf_counter()
+            self._widget_setter(self._got)
+            instrumentation.record_widget_setter(self._widget, self._widget_setter, time.perf_counter() - start)
+        else:
+            self._widget_setter(self._got)
         self._widget.blockSignals(False)
 
     def __call__(self, *args, **kwargs):
-        self._got = self._model_getter()  # Save value immediately so displayed UI value matches model at time of update
-        self._sig_update_widget.emit()
+        # Save value immediately so displayed UI value matches model at time of update
+        if self._get():
+            self._sig_update_widget.emit()
+
+
+class CoalescingQWidgetUpdater(QWidgetUpdater):
+    """
+    QWidgetUpdater that coalesces updates: the latest model value wins, at most one update is pending at any time, and
+    the widget setter is called at most max_update_rate times per second. Must be constructed on the main thread.
+    """
+
+    def __init__(self,
+                 widget: QWidget,
+                 widget_setter: Callable[..., None],
+                 model_getter: Callable[[], Any],
+                 max_update_rate: float,
+                 versioned: bool = False):
+        super().__init__(widget, widget_setter, model_getter, versioned)
+        self._min_interval = 1 / max_update_rate
+        self._last_update = float('-inf')
+        self._pending = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+
+        self._sig_update_widget.disconnect(self._update_widget)
+        self._sig_update_widget.connect(self._schedule_update)
+
+    def _schedule_update(self):
+        # Runs on the main thread. Flush once the minimum interval since the last update has elapsed.
+        if self._timer.isActive():
+            return
+        wait = self._last_update + self._min_interval - time.perf_counter()
+        self._timer.start(int(max(0.0, wait) * 1000))
+
+    def _flush(self):
+        # Clear the flag before reading the value, so a concurrent write either lands in this update or schedules
+        # another one.
+        self._pending = False
+        self._last_update = time.perf_counter()
+        self._update_widget()
+
+    def __call__(self, *args, **kwargs):
+        if not self._get():
+            return
+        if not self._pending:
+            self._pending = True
+            self._sig_update_widget.emit()
+
+
+class LazyQWidgetUpdater:
+    """
+    Stand-in for a QWidgetUpdater which has not been created (on the main thread) yet. Notifications received before
+    creation are remembered and forwarded once the real updater exists. As updaters always read the latest model value,
+    remembering that a notification occurred is sufficient. Callable from any thread.
+    """
+
+    def __init__(self,
+                 widget: QWidget,
+                 widget_setter: Callable[..., None],
+                 model_getter: Callable[[], Any],
+                 max_update_rate: Optional[float] = None,
+                 versioned: bool = False):
+        self._args = (widget, widget_setter, model_getter, max_update_rate, versioned)
+        self._updater: Optional[Callable[[], None]] = None
+        self._pending = False
+
+    def _materialise(self, headless: bool = False) -> None:
+        # Intended to be run on the main thread only!
+        updater = (lambda: None) if headless else MainThread._make_QWidgetUpdater(*self._args)
+        self._args = None
+        # Publish updater before checking pending; see __call__.
+        self._updater = updater
+        if self._pending:
+            self._pending = False
+            updater()
+
+    def __call__(self, *args, **kwargs):
+        updater = self._updater
+        if updater is None:
+            # Flag the notification, then check again in case the updater was published in the meantime (in which case
+            # the flag may have been missed). At worst this results in a redundant update.
+            self._pending = True
+            updater = self._updater
+            if updater is None:
+                return
+        updater()
+
+
+class QWidgetChangeApplier:
+    """
+    Applies Changes of a collection-valued property to a widget on the main thread, in the order they occurred. Resets
+    are applied by setting a copy of the whole collection, taken when the reset occurs. Callable from any thread.
+    """
+
+    def __init__(self,
+                 widget: QWidget,
+                 widget_setter: Callable[..., None],
+                 apply_change: Callable[[Change], None],
+                 model_getter: Callable[[], Any]):
+        self._widget = widget
+        self._widget_setter = widget_setter
+        self._apply_change = apply_change
+        self._model_getter = model_getter
+        # Changes not yet applied, in order. Any thread may append; only the main thread pops. A change made on the
+        # main thread applies those queued by other threads first, rather than overtaking them.
+        self._pending: Deque[Tuple[Callable[..., None], Any]] = deque()
+
+    def _apply(self, f: Callable[..., None], arg) -> None:
+        self._widget.blockSignals(True)
+        if instrumentation.enabled:
+            start = time.perf_counter()
+            f(arg)
+            instrumentation.record_widget_setter(self._widget, f, time.perf_counter() - start)
+        else:
+            f(arg)
+        self._widget.blockSignals(False)
+
+    def _apply_pending(self) -> None:
+        # Intended to be run on the main thread only!
+        pending = self._pending
+        while pending:
+            self._apply(*pending.popleft())
+
+    def __call__(self, change: Change):
+        if change.kind == 'reset':
+            # Copy now, so that subsequent changes are applied on top of the state they were made to.
+            self._pending.append((self._widget_setter, list(self._model_getter())))
+        else:
+            self._pending.append((self._apply_change, change))
+        MainThread.execute(self._apply_pending)
 
 
 class MainThread(QObject):
@@ -34,20 +200,14 @@ class MainThread(QObject):
     # Instance (singleton)
     _instance: Optional['MainThread'] = None
 
-    # Variables for inter-thread communication
-    _updater_mutex = Lock()
-    _in_widget: Optional[QWidget] = None
-    _in_widget_setter: Optional[Callable[..., None]] = None
-    _in_model_getter: Optional[Callable[[], Any]] = None
-    _updater_out: Optional[QWidgetUpdater] = None
+    # Multi-producer, single-consumer job queue for inter-thread communication. Any thread may append (deque appends
+    # are atomic); only the main thread pops. The main thread is woken by a queued signal, and drains all jobs present
+    # at wakeup in a single batch. Jobs are (function, future, whether to report exceptions).
+    _jobs: Deque[Tuple[Callable[[], Any], Future, bool]] = deque()
+    _wakeup_pending = False
 
-    # Variables for inter-thread communication of general executor
-    _executor_mutex = Lock()
-    _in_function: Optional[Callable[[], None]] = None
-
-    # Signal for invoking method on main thread
-    _sig_make_object = Signal()
-    _sig_execute_function = Signal()
+    # Signal for waking the main thread to drain the job queue
+    _sig_drain_jobs = Signal()
 
     @classmethod
     def initialise(cls) -> None:
@@ -70,63 +230,103 @@ class MainThread(QObject):
         elif app.thread() != QThread.currentThread():
             raise RuntimeError('QWidgetUpdaterFactory must be created on the main thread')
         else:
-            self._sig_make_object.connect(self._create_QWidgetUpdater_slot)
-            self._sig_execute_function.connect(self._execute_slot)
+            self._sig_drain_jobs.connect(self._drain_jobs_slot)
 
     @classmethod
-    def _execute_slot(cls):
+    def _drain_jobs_slot(cls):
         # Intended to be run as a slot only!
-        cls._in_function()
-        cls._in_function = None
-        cls._executor_mutex.release()
+        # Clear the wakeup flag before draining, so a job enqueued after the drain below always triggers a new wakeup.
+        cls._wakeup_pending = False
+        jobs = cls._jobs
+        for _ in range(len(jobs)):
+            fn, future, report_exceptions = jobs.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn()
+            except BaseException as e:
+                future.set_exception(e)
+                if report_exceptions:
+                    # Most callers don't keep the future, so report as Qt would for an exception raised in a slot
+                    sys.excepthook(type(e), e, e.__traceback__)
+            else:
+                future.set_result(result)
 
     @classmethod
-    def _create_QWidgetUpdater_slot(cls):
-        # Intended to be run as a slot only!
-        cls._updater_out = QWidgetUpdater(cls._in_widget, cls._in_widget_setter, cls._in_model_getter)
-        cls._in_widget = None
-        cls._in_widget_setter = None
-        cls._in_model_getter = None
-        cls._updater_mutex.release()
+    def _enqueue(cls, fn: Callable[[], T], report_exceptions: bool = True) -> 'Future[T]':
+        # Callable from any thread. If report_exceptions is false, the caller is responsible for checking the future.
+        future = Future()
+        cls._jobs.append((fn, future, report_exceptions))
+        if not cls._wakeup_pending:
+            # Racing producers may both emit; the surplus wakeup finds an empty (or shorter) queue, which is harmless.
+            cls._wakeup_pending = True
+            cls._instance._sig_drain_jobs.emit()
+        return future
+
+    @staticmethod
+    def _make_QWidgetUpdater(widget, widget_setter, model_getter, max_update_rate, versioned=False) -> QWidgetUpdater:
+        if max_update_rate is None:
+            return QWidgetUpdater(widget, widget_setter, model_getter, versioned)
+        return CoalescingQWidgetUpdater(widget, widget_setter, model_getter, max_update_rate, versioned)
 
     @classmethod
     def execute(
             cls,
-            fn: Callable[[], None],
+            fn: Callable[[], T],
             blocking: bool = False
-    ) -> None:
+    ) -> 'Future[T]':
+        """
+        Executes fn on the main thread.
+        Parameters
+        ----------
+        fn          The function to execute.
+        blocking    If true, wait until fn has been executed before returning.
+
+        Returns a Future holding the result of fn, or the exception it raised. If called on the main thread (or without
+        a QT event queue), fn is executed immediately and any exception is raised to the caller, as it is if blocking.
+        Otherwise, exceptions are also passed to sys.excepthook, so that they aren't lost if the Future is discarded.
+        -------
+
+        """
         app = QtWidgets.QApplication.instance()
         if app is None or app.thread() == QThread.currentThread():
             # If already on main thread then just execute directly. This check works even if standard python threads
             # (not QThreads) are used. Function called explicitly (instead of relying on direct QT signal) as the QT
             # event queue may not be available.
-            fn()
-            return
+            future = Future()
+            future.set_running_or_notify_cancel()
+            future.set_result(fn())
+            return future
 
         # On non-main thread
-        cls._executor_mutex.acquire()  # Will be released when object is created (on main thread)
-        cls._in_function = fn
-        cls._instance._sig_execute_function.emit()  # releases lock
-
+        future = cls._enqueue(fn, report_exceptions=not blocking)
         if blocking:
-            cls._executor_mutex.acquire()
-            cls._executor_mutex.release()
+            # Raises fn's exception, if any
+            future.result()
+        return future
 
     @classmethod
     def create_QWidgetUpdater(
             cls,
             widget: QWidget,
             widget_setter: Callable[[T], None],
-            model_getter: Callable[[], T]
+            model_getter: Callable[[], T],
+            max_update_rate: Optional[float] = None,
+            blocking: bool = True,
+            versioned: bool = False
     ) -> Callable[[], None]:
         """
         Creates a new QWidgetUpdater. If this is called from a secondary thread, the QWidgetUpdater is created on the
-         main thread via signal.
+         main thread via signal. If blocking is false, a LazyQWidgetUpdater is returned immediately instead of waiting
+         for the main thread.
         Parameters
         ----------
         widget The widget to be updated, required so signals can be blocked during update
         widget_setter Function to be called on the widget with input from model_getter()
         model_getter Retrieves the value to be provided to widget_setter
+        max_update_rate If given, updates are coalesced and applied at most this many times per second (Hz)
+        blocking If false, do not wait for the main thread when called from a secondary thread
+        versioned If true, model_getter returns (version, value) pairs, and outdated values are skipped
 
         Returns QWidgetUpdater constructed on the main thread
         -------
@@ -140,18 +340,55 @@ class MainThread(QObject):
             # If already on main thread then just make function directly. This check works even if standard python
             # threads (not QThreads) are used. Function called explicitly (instead of relying on direct QT signal) as
             # the QT event queue may not be available.
-            return QWidgetUpdater(widget, widget_setter, model_getter)
+            return cls._make_QWidgetUpdater(widget, widget_setter, model_getter, max_update_rate, versioned)
         # On non-main thread
-        # Acquire lock and set input variables. Lock will be released & inputs will be cleared on main thread.
-        cls._updater_mutex.acquire()
-        cls._in_widget = widget
-        cls._in_widget_setter = widget_setter
-        cls._in_model_getter = model_getter
-        cls._instance._sig_make_object.emit()
-
-        # Block until main thread does it's job, and get output & rest output variable.
-        cls._updater_mutex.acquire()
-        out = cls._updater_out
-        cls._updater_out = None
-        cls._updater_mutex.release()
-        return out
+        if not blocking:
+            updater = LazyQWidgetUpdater(widget, widget_setter, model_getter, max_update_rate, versioned)
+            cls.materialise((updater,))
+            return updater
+        # Block until main thread does its job.
+        return cls._enqueue(
+            lambda: cls._make_QWidgetUpdater(widget, widget_setter, model_getter, max_update_rate, versioned),
+            report_exceptions=False
+        ).result()
+
+    @classmethod
+    def create_QWidgetChangeApplier(
+            cls,
+            widget: QWidget,
+            widget_setter: Callable[..., None],
+            apply_change: Callable[[Change], None],
+            model_getter: Callable[[], Any]
+    ) -> Callable[[Change], None]:
+        """
+        Creates a QWidgetChangeApplier. Unlike QWidgetUpdaters, these need not be created on the main thread.
+        """
+        if QtWidgets.QApplication.instance() is None:
+            # Headless mode; applier doesn't need to do anything.
+            return lambda change: None
+        return QWidgetChangeApplier(widget, widget_setter, apply_change, model_getter)
+
+    @classmethod
+    def materialise(cls, updaters: Iterable[LazyQWidgetUpdater]) -> 'Future[None]':
+        """
+        Creates the QWidgetUpdaters behind many LazyQWidgetUpdaters in a single hop to the main thread. Does not block.
+
+        Returns a Future which completes once all updaters are created.
+        -------
+
+        """
+        updaters = tuple(updaters)
+        headless = QtWidgets.QApplication.instance() is None
+
+        def materialise_all():
+            for updater in updaters:
+                # noinspection PyProtectedMember
+                updater._materialise(headless)
+
+        return cls.execute(materialise_all)
+
+
+if instrumentation.enabled:
+    # Enabled before this module was imported
+    # noinspection PyProtectedMember
+    instrumentation._instrument_main_thread(MainThread)
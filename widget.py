@@ -1,7 +1,20 @@
-from typing import List, Union
+import difflib
+import sys
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import List, Union, Sequence, Mapping, Optional, Tuple, Any, Callable, TYPE_CHECKING
 
-from PySide2.QtGui import QMovie
-from PySide2.QtWidgets import QTableWidget, QTableWidgetItem, QListWidget, QLabel
+from .observable_collections import Change
+from .qt import QAbstractTableModel, QAbstractListModel, QModelIndex, Qt, QSize, QRect, QPoint, QPointF, QTimer, \
+    QMovie, QImage, QPainter, QPen, QPolygonF, \
+    QTableWidget, QTableWidgetItem, QListWidget, QLabel, QTableView, QHeaderView, QListView, QWidget
+from .ring_buffer import RingBuffer
+from .table_index import TableIndex
+from .threads import MainThread
+
+if TYPE_CHECKING:
+    import numpy
 
 
 class QMovieWidget(QLabel):
@@ -28,13 +41,31 @@ class BindableQListWidget(QListWidget):
         return [self.item(i).text() for i in range(self.count())]
 
     def set_text_items(self, text_items: List[str]):
+        self.clear()
         self.addItems(text_items)
 
+    def apply_change(self, change: Change) -> None:
+        """
+        Applies a (non-reset) Change of the bound list.
+        """
+        i = change.index
+        if change.kind == 'insert':
+            self.insertItems(i, list(change.items))
+        elif change.kind == 'remove':
+            for _ in change.items:
+                self.takeItem(i)
+        elif change.kind == 'replace':
+            for k, text in enumerate(change.items):
+                self.item(i + k).setText(text)
+        elif change.kind == 'move':
+            self.insertItem(change.destination, self.takeItem(i))
+
 
 class BindableQTableWidget(QTableWidget):
     """
     Table widget that exposes its data for updating, and clears and repopulates the table on data change.
-    Intended to be used for simple one-way (VM->Table) src for small datasets that don't change often.
+    Intended to be used for simple one-way (VM->Table) src for small datasets that don't change often. For large
+    datasets, use BindableQTableView instead.
     """
 
     def __init__(self, *args, **kwargs):
@@ -60,7 +91,538 @@ class BindableQTableWidget(QTableWidget):
         self.setRowCount(0)
         self.setRowCount(len(data))
         for i, row in enumerate(data):
-            for j, element in enumerate(row):
-                if type(element) is str:
-                    element = QTableWidgetItem(element)
-                self.setItem(i, j, element)
+            self._set_row(i, row)
+
+    def apply_change(self, change: Change) -> None:
+        """
+        Applies a (non-reset) Change of the bound list of rows.
+        """
+        i = change.index
+        if change.kind == 'insert':
+            for k, row in enumerate(change.items):
+                self.insertRow(i + k)
+                self._set_row(i + k, row)
+        elif change.kind == 'remove':
+            for _ in change.items:
+                self.removeRow(i)
+        elif change.kind == 'replace':
+            for k, row in enumerate(change.items):
+                self._set_row(i + k, row)
+        elif change.kind == 'move':
+            row = [self.takeItem(i, j) for j in range(self.columnCount())]
+            self.removeRow(i)
+            self.insertRow(change.destination)
+            self._set_row(change.destination, row)
+
+    def _set_row(self, i: int, row: Union[List[str], List[QTableWidgetItem]]):
+        for j, element in enumerate(row):
+            if type(element) is str:
+                element = QTableWidgetItem(element)
+            self.setItem(i, j, element)
+
+
+Columns = Union[Sequence[Sequence], Mapping[str, Sequence]]
+
+
+class ColumnarTableModel(QAbstractTableModel):
+    """
+    Read-only table model backed by a columnar store, i.e. a sequence of equal length columns (e.g. NumPy arrays or
+    lists), or a mapping of header to column. Cells are only formatted when the view requests them, so the cost of
+    displaying the table is independent of the number of rows.
+    Rows can be shown in a different order, or a subset of them shown, by setting a row order (e.g. from a TableIndex).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ColumnarTableModel, self).__init__(*args, **kwargs)
+        self._source: Columns = ()
+        self._columns: List[Sequence] = []
+        self._headers: Optional[List[str]] = None
+        self._n_rows = 0
+        # Source row of each displayed row, or None to display all rows in order
+        self._row_order: Optional[Sequence[int]] = None
+
+    def columns(self) -> Columns:
+        return self._source
+
+    def set_columns(self, columns: Columns) -> None:
+        if isinstance(columns, Mapping):
+            headers = [str(h) for h in columns.keys()]
+            cols = list(columns.values())
+        else:
+            headers = None
+            cols = list(columns)
+        n_rows = len(cols[0]) if cols else 0
+        if any(len(c) != n_rows for c in cols):
+            raise ValueError(f'Columns must have equal lengths, but got lengths {[len(c) for c in cols]}')
+
+        self.beginResetModel()
+        if n_rows < self._n_rows:
+            # Rows may have been removed. Otherwise, the row order stays valid (if stale) until it's replaced.
+            self._row_order = None
+        self._source = columns
+        self._columns = cols
+        self._headers = headers
+        self._n_rows = n_rows
+        self.endResetModel()
+
+    def row_order(self) -> Optional[Sequence[int]]:
+        return self._row_order
+
+    def set_row_order(self, row_order: Optional[Sequence[int]]) -> None:
+        self.beginResetModel()
+        self._row_order = row_order
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._n_rows if self._row_order is None else len(self._row_order)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        row = index.row() if self._row_order is None else self._row_order[index.row()]
+        return str(self._columns[index.column()][row])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal and self._headers is not None:
+            return self._headers[section]
+        return str(section + 1)
+
+
+class BindableQTableView(QTableView):
+    """
+    Virtualized table view for large datasets, backed by a ColumnarTableModel. Setting the data replaces the columns
+    without copying them or creating any widget items; only visible cells are read.
+    Intended to be used for one-way (VM->Table) src.
+
+    Rows can be sorted (by clicking a column header, or `sort_by`) and filtered (`set_filter`). The row order is computed
+    by a TableIndex on a worker thread whenever the columns, sort or filter change, and swapped in once done, so sorting
+    large tables doesn't block the GUI. Requires NumPy.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BindableQTableView, self).__init__(*args, **kwargs)
+        self._model = ColumnarTableModel(self)
+        self.setModel(self._model)
+        # Fixed row heights, so the view doesn't measure every row.
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
+        self._sort_column: Optional[int] = None
+        self._descending = False
+        self._predicate: Optional[Callable[[Sequence[Sequence]], Sequence[bool]]] = None
+        self._index = TableIndex()
+        # Single worker, so the index is only used by one thread. Jobs superseded before they start are skipped.
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._generation = 0
+        header = self.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        header.sortIndicatorChanged.connect(self._sort_indicator_changed)
+
+    def columns(self) -> Columns:
+        return self._model.columns()
+
+    def set_columns(self, columns: Columns) -> None:
+        self._model.set_columns(columns)
+        if self._executor is not None:
+            # Drop the cached sorted copies of columns which were replaced rather than appended to
+            # noinspection PyProtectedMember
+            self._executor.submit(self._index.evict_stale, self._model._columns, self._sort_column)
+        if self._sort_column is not None or self._predicate is not None:
+            self._update_row_order()
+
+    def sort_by(self, column: Optional[int], descending: bool = False) -> None:
+        """
+        Sorts rows by the values of column, or restores the original order if None.
+        """
+        self._sort_column = column
+        self._descending = descending
+        self._update_row_order()
+
+    def set_filter(self, predicate: Optional[Callable[[Sequence[Sequence]], Sequence[bool]]]) -> None:
+        """
+        Shows only the rows for which predicate(columns) is true, e.g. `lambda c: c[2] > 0`, or all rows if None. The
+        predicate is run on a worker thread, and should be vectorised (return a boolean array).
+        """
+        self._predicate = predicate
+        self._update_row_order()
+
+    def _sort_indicator_changed(self, column: int, order) -> None:
+        self.sort_by(column if column >= 0 else None, order == Qt.DescendingOrder)
+
+    def _update_row_order(self) -> None:
+        self._generation += 1
+        if self._sort_column is None and self._predicate is None:
+            self._model.set_row_order(None)
+            return
+        if self._executor is None:
+            executor = self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='table-index')
+            self.destroyed.connect(lambda: executor.shutdown(wait=False))
+        model = self._model
+        # noinspection PyProtectedMember
+        self._executor.submit(self._compute_row_order,
+                              self._generation, model._columns, self._sort_column, self._descending, self._predicate)
+
+    def _compute_row_order(self, generation: int, columns, sort_column, descending, predicate) -> None:
+        if generation != self._generation:
+            return
+        row_order = self._index.row_order(columns, sort_column, descending, predicate)
+        MainThread.execute(partial(self._set_row_order, generation, row_order))
+
+    def _set_row_order(self, generation: int, row_order) -> None:
+        if generation == self._generation:
+            self._model.set_row_order(row_order)
+
+
+# Largest product of the lengths of the changed regions of two lists which TextListModel diffs row by row
+_MAX_DIFF_COST = 1_000_000
+
+
+class TextListModel(QAbstractListModel):
+    """
+    List model of strings which, when set, applies the difference between the old and new lists as row insertions,
+    removals and changes rather than resetting the model. Selection and scroll position are therefore preserved.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TextListModel, self).__init__(*args, **kwargs)
+        self._items: List[str] = []
+
+    def text_items(self) -> List[str]:
+        # Not copied; do not modify.
+        return self._items
+
+    def set_text_items(self, text_items: Sequence[str]) -> None:
+        old = self._items
+        new = list(text_items)
+        n_old, n_new = len(old), len(new)
+
+        # Fast path for the common case of appending to the list. Slice comparison runs in C.
+        if n_new >= n_old and new[:n_old] == old:
+            self._insert_rows(n_old, new[n_old:])
+            return
+        # Fast path for a capped list (e.g. a log) whose oldest rows were dropped, and new rows (if any) appended
+        head = self._removed_head(old, new)
+        if head is not None:
+            self._remove_rows(0, head)
+            self._insert_rows(n_old - head, new[n_old - head:])
+            return
+
+        # Trim common prefix and suffix, leaving the changed region old[prefix:n_old-suffix]
+        limit = min(n_old, n_new)
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[n_old - suffix - 1] == new[n_new - suffix - 1]:
+            suffix += 1
+        old_end, new_end = n_old - suffix, n_new - suffix
+
+        if (old_end - prefix) * (new_end - prefix) <= _MAX_DIFF_COST:
+            opcodes = difflib.SequenceMatcher(None, old[prefix:old_end], new[prefix:new_end],
+                                              autojunk=False).get_opcodes()
+        else:
+            # Too large to diff (matching is quadratic), so treat the whole region as replaced
+            opcodes = [('replace', 0, old_end - prefix, 0, new_end - prefix)]
+        # Apply in order; rows shift by the number inserted (or removed) so far.
+        shift = prefix
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                continue
+            row = i1 + shift
+            # Rows in both lists are changed in place; the rest are inserted or removed.
+            n_changed = min(i2 - i1, j2 - j1)
+            self._change_rows(row, new[prefix + j1:prefix + j1 + n_changed])
+            self._insert_rows(row + n_changed, new[prefix + j1 + n_changed:prefix + j2])
+            self._remove_rows(row + n_changed, i2 - i1 - n_changed)
+            shift += (j2 - j1) - (i2 - i1)
+
+    @staticmethod
+    def _removed_head(old: List[str], new: List[str]) -> Optional[int]:
+        """
+        Returns k > 0 if new is old[k:] followed by any new rows, or None. Only the first few candidates for k are
+        checked, so lists of many duplicates take the general path.
+        """
+        n_old = len(old)
+        if not new or not old:
+            return None
+        k = 0
+        for _ in range(8):
+            try:
+                k = old.index(new[0], k + 1)
+            except ValueError:
+                return None
+            if n_old - k <= len(new) and old[k:] == new[:n_old - k]:
+                return k
+        return None
+
+    def _change_rows(self, row: int, items: List[str]) -> None:
+        if items:
+            self._items[row:row + len(items)] = items
+            self.dataChanged.emit(self.index(row), self.index(row + len(items) - 1))
+
+    def _insert_rows(self, row: int, items: List[str]) -> None:
+        if items:
+            self.beginInsertRows(QModelIndex(), row, row + len(items) - 1)
+            self._items[row:row] = items
+            self.endInsertRows()
+
+    def _remove_rows(self, row: int, count: int) -> None:
+        if count > 0:
+            self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+            del self._items[row:row + count]
+            self.endRemoveRows()
+
+    def apply_change(self, change: Change) -> None:
+        """
+        Applies a (non-reset) Change of the bound list.
+        """
+        i = change.index
+        items = self._items
+        if change.kind == 'insert':
+            self.beginInsertRows(QModelIndex(), i, i + len(change.items) - 1)
+            items[i:i] = change.items
+            self.endInsertRows()
+        elif change.kind == 'remove':
+            self.beginRemoveRows(QModelIndex(), i, i + len(change.items) - 1)
+            del items[i:i + len(change.items)]
+            self.endRemoveRows()
+        elif change.kind == 'replace':
+            items[i:i + len(change.items)] = change.items
+            self.dataChanged.emit(self.index(i), self.index(i + len(change.items) - 1))
+        elif change.kind == 'move':
+            # Qt expects the destination row *before* the move.
+            destination = change.destination + 1 if change.destination > i else change.destination
+            self.beginMoveRows(QModelIndex(), i, i, QModelIndex(), destination)
+            items.insert(change.destination, items.pop(i))
+            self.endMoveRows()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return self._items[index.row()]
+
+
+class BindableQListView(QListView):
+    """
+    List view backed by a TextListModel. Updates only touch the rows which changed, so it is suitable for long lists
+    which change incrementally (e.g. logs).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BindableQListView, self).__init__(*args, **kwargs)
+        self._model = TextListModel(self)
+        self.setModel(self._model)
+        self.setUniformItemSizes(True)
+
+    def text_items(self) -> List[str]:
+        return self._model.text_items()
+
+    def set_text_items(self, text_items: Sequence[str]) -> None:
+        self._model.set_text_items(text_items)
+
+    def apply_change(self, change: Change) -> None:
+        self._model.apply_change(change)
+
+
+# Frames are either encoded images (e.g. PNG or JPEG bytes), or NumPy arrays of shape (height, width) or
+# (height, width, 3 or 4) with dtype uint8.
+Frame = Union[bytes, 'numpy.ndarray']
+
+
+class BindableQImageWidget(QWidget):
+    """
+    Displays frames (e.g. from a camera) bound to a model property. Frames are decoded and scaled to the widget's size
+    on a worker pool; the GUI thread only paints the result. While a frame is being decoded, only the newest frame set
+    since is kept, so a fast source never builds up a backlog of stale frames.
+    """
+    _default_executor: Optional[Executor] = None
+
+    def __init__(self, *args, executor: Optional[Executor] = None, **kwargs):
+        super(BindableQImageWidget, self).__init__(*args, **kwargs)
+        self._executor = executor
+        self._frame: Optional[Frame] = None
+        self._image = QImage()
+        # Array viewed by _image, if it wasn't copied
+        self._image_buffer = None
+        self._lock = threading.Lock()
+        self._decoding = False
+        self._pending: Optional[Tuple[Frame, QSize, int]] = None
+        # Incremented by each set_frame. Decoded frames older than the frame (or clearing) shown are dropped.
+        self._generation = 0
+        self._shown_generation = 0
+
+    def frame(self) -> Optional[Frame]:
+        return self._frame
+
+    def set_frame(self, frame: Optional[Frame]) -> None:
+        self._frame = frame
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if frame is None:
+                # Any frame being decoded is dropped by _show
+                self._pending = None
+                start_decoding = False
+            else:
+                self._pending = frame, self.size(), generation
+                # If already decoding, decoded once the current frame is done, unless superseded by then.
+                start_decoding = not self._decoding
+                self._decoding = True
+        if frame is None:
+            self._show(QImage(), None, generation)
+        elif start_decoding:
+            self._executor_or_default().submit(self._decode_pending)
+
+    def _executor_or_default(self) -> Executor:
+        if self._executor is not None:
+            return self._executor
+        if BindableQImageWidget._default_executor is None:
+            BindableQImageWidget._default_executor = ThreadPoolExecutor(max_workers=2,
+                                                                        thread_name_prefix='image-decoder')
+        return BindableQImageWidget._default_executor
+
+    def _decode_pending(self) -> None:
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._decoding = False
+                    return
+                (frame, size, generation), self._pending = self._pending, None
+            try:
+                image, buffer = self.to_QImage(frame)
+                if not image.isNull() and size.isValid() and not size.isEmpty() and image.size() != size:
+                    image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                    buffer = None
+            except Exception as e:
+                # Report (the executor's future is discarded), keep showing the previous frame, and carry on with any
+                # newer frame.
+                sys.excepthook(type(e), e, e.__traceback__)
+                continue
+            MainThread.execute(partial(self._show, image, buffer, generation))
+
+    @staticmethod
+    def to_QImage(frame: Frame) -> Tuple[QImage, Any]:
+        """
+        Decodes frame. Arrays are viewed, not copied, if their rows are contiguous; the returned buffer must then be
+        kept alive as long as the image.
+        """
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            return QImage.fromData(bytes(frame)), None
+        import numpy as np
+        array = frame
+        if array.dtype != np.uint8:
+            raise ValueError(f'Expected a uint8 image, but received {array.dtype}')
+        if array.ndim == 2:
+            image_format = QImage.Format_Grayscale8
+        elif array.ndim == 3 and array.shape[2] in (3, 4):
+            image_format = QImage.Format_RGB888 if array.shape[2] == 3 else QImage.Format_RGBA8888
+        else:
+            raise ValueError(f'Expected an image of shape (h, w), (h, w, 3) or (h, w, 4), but received {array.shape}')
+        if array.strides[-1] != 1 or (array.ndim == 3 and array.strides[1] != array.shape[2]):
+            array = np.ascontiguousarray(array)
+        height, width = array.shape[:2]
+        return QImage(array.data, width, height, array.strides[0], image_format), array
+
+    def _show(self, image: QImage, buffer, generation: int) -> None:
+        if generation < self._shown_generation:
+            # Decoded before a newer frame was shown, or the widget was cleared
+            return
+        self._shown_generation = generation
+        self._image = image
+        self._image_buffer = buffer
+        try:
+            self.update()
+        except RuntimeError:
+            # Widget deleted while decoding
+            pass
+
+    def paintEvent(self, event) -> None:
+        if self._image.isNull():
+            return
+        size = self._image.size().scaled(self.size(), Qt.KeepAspectRatio)
+        target = QRect(QPoint(0, 0), size)
+        target.moveCenter(self.rect().center())
+        QPainter(self).drawImage(target, self._image)
+
+
+class BindableQPlotWidget(QWidget):
+    """
+    Plots the samples of a RingBuffer as a line, repainting at most max_fps times per second and only when there are
+    new samples. When there are more samples than pixel columns, each column shows the min and max of its samples, so
+    the cost of painting depends on the widget's width rather than the number of samples.
+
+    Bind a model property holding a RingBuffer (`samples`), which the model appends to without notifying. Bindings
+    only pass on the latest value, so streams can't be bound sample by sample.
+    """
+
+    def __init__(self, *args, capacity: int = 10_000, max_fps: float = 30.0, **kwargs):
+        super(BindableQPlotWidget, self).__init__(*args, **kwargs)
+        self._buffer = RingBuffer(capacity)
+        self._painted_version = -1
+        self._y_range: Optional[Tuple[float, float]] = None
+        self.pen = QPen(Qt.darkBlue)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._repaint_if_changed)
+        self._timer.start(int(1000 / max_fps))
+
+    def samples(self) -> RingBuffer:
+        return self._buffer
+
+    def set_samples(self, samples: RingBuffer) -> None:
+        self._buffer = samples
+        self._painted_version = -1
+
+    def append_sample(self, value) -> None:
+        """
+        Appends a sample to the plotted buffer. Like the buffer's other writers, must only be called from one thread.
+        """
+        self._buffer.append(value)
+
+    def set_y_range(self, y_range: Optional[Tuple[float, float]]) -> None:
+        """
+        Fixes the plotted range of values, or fits it to the samples if None.
+        """
+        self._y_range = y_range
+        self.update()
+
+    def _repaint_if_changed(self) -> None:
+        if self._buffer.version != self._painted_version:
+            self.update()
+
+    def paintEvent(self, event) -> None:
+        import numpy as np
+        buffer = self._buffer
+        self._painted_version = buffer.version
+        values = buffer.view()
+        width, height = self.width(), self.height()
+        n = len(values)
+        if n < 2 or width < 2:
+            return
+        if n > 2 * width:
+            # Min and max of each pixel column, alternating, so the line spans each column's range of samples
+            starts = np.arange(width) * n // width
+            y = np.empty(2 * width)
+            y[0::2] = np.minimum.reduceat(values, starts)
+            y[1::2] = np.maximum.reduceat(values, starts)
+            x = np.repeat(np.arange(width, dtype=float), 2)
+        else:
+            y = values.astype(float)
+            x = np.arange(n) * ((width - 1) / (n - 1))
+        low, high = self._y_range or (np.nanmin(y), np.nanmax(y))
+        if not high > low:
+            low, high = low - 0.5, high + 0.5
+        y = (high - y) * ((height - 1) / (high - low))
+        painter = QPainter(self)
+        painter.setPen(self.pen)
+        painter.drawPolyline(QPolygonF([QPointF(px, py) for px, py in zip(x.tolist(), y.tolist())]))